@@ -0,0 +1,121 @@
+"""End-to-end dashboard runs through Streamlit's AppTest, headless: a cold
+start with empty Streamlit caches (the parsed snapshot on disk is reused),
+then every region in the sidebar selectbox, each rerun twice.
+
+    python -m benchmarks.bench_apps [final_app.py streamlit_app.py]
+
+Per app it reports the cold start, the median first and warm rerun per
+region, the peak traced memory of a cold start and the Vega-Lite payload
+(spec JSON plus Arrow data) the browser would receive across all regions.
+
+Cold starts always parse the snapshot: the warm-start bundle directory is
+pinned to an empty one (see bench_first_paint for bundled starts), so the
+numbers don't depend on whether a bundle happens to be on disk.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Before anything imports warm_start, which reads this once
+os.environ["SEA_LEVEL_BUNDLE"] = tempfile.mkdtemp(prefix="sea-level-nobundle-")
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = ["final_app.py", "streamlit_app.py"]
+TIMEOUT = 300
+
+
+def _clear_caches():
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+def _payload_bytes(at):
+    """Bytes of every Vega-Lite chart on the page as sent to the browser."""
+    total = 0
+    for chart in at.get("vega_lite_chart"):
+        proto = chart.proto
+        total += len(proto.spec) + len(proto.data.data)
+        total += sum(len(dataset.data.data) for dataset in proto.datasets)
+    return total
+
+
+def _check(at, script):
+    if at.exception:
+        raise RuntimeError(f"{script} raised: {at.exception[0].value}")
+
+
+def _cold_start(script):
+    _clear_caches()
+    started = time.perf_counter()
+    at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=TIMEOUT).run()
+    _check(at, script)
+    return at, time.perf_counter() - started
+
+
+def _peak_memory(script):
+    """Peak memory Python (and numpy) allocated during a cold start."""
+    _clear_caches()
+    tracemalloc.start()
+    try:
+        at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=TIMEOUT).run()
+        _check(at, script)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_app(script):
+    """{metric: value} for one app, plus per-region details under "regions"."""
+    at, cold = _cold_start(script)
+    region_box = next(box for box in at.sidebar.selectbox if box.label == "Region")
+    regions = []
+    for region in region_box.options:
+        region_box = next(box for box in at.sidebar.selectbox if box.label == "Region")
+        started = time.perf_counter()
+        at = region_box.set_value(region).run()
+        first = time.perf_counter() - started
+        _check(at, script)
+        started = time.perf_counter()
+        at = at.run()
+        warm = time.perf_counter() - started
+        _check(at, script)
+        regions.append({"region": region, "first_s": first, "warm_s": warm, "payload_bytes": _payload_bytes(at)})
+
+    name = os.path.splitext(script)[0]
+    return {
+        f"{name}.cold_start_s": cold,
+        f"{name}.first_rerun_s": statistics.median(r["first_s"] for r in regions),
+        f"{name}.warm_rerun_s": statistics.median(r["warm_s"] for r in regions),
+        f"{name}.peak_memory_bytes": _peak_memory(script),
+        f"{name}.payload_bytes": sum(r["payload_bytes"] for r in regions),
+    }, regions
+
+
+def run(apps=APPS):
+    metrics = {}
+    for script in apps:
+        app_metrics, _ = bench_app(script)
+        metrics.update(app_metrics)
+    return metrics
+
+
+def main(argv=None):
+    apps = (argv if argv is not None else sys.argv[1:]) or APPS
+    for script in apps:
+        metrics, regions = bench_app(script)
+        print(f"{script}")
+        print(f"  {'Region':<16}{'first (ms)':>12}{'warm (ms)':>11}{'payload (KB)':>14}")
+        for r in regions:
+            print(f"  {r['region']:<16}{r['first_s'] * 1e3:>12.1f}{r['warm_s'] * 1e3:>11.1f}{r['payload_bytes'] / 1e3:>14.1f}")
+        for metric, value in metrics.items():
+            print(f"  {metric:<36}{value:>14.4g}")
+
+
+if __name__ == "__main__":
+    main()
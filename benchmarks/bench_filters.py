@@ -0,0 +1,29 @@
+"""Region filter cost: full boolean mask (the old per-rerun path) against the
+offset-index slice, for every region in the sidebar selectbox.
+
+    python -m benchmarks.bench_filters
+"""
+import timeit
+
+from sea_level_data import load_sea_levels
+from shared_dataset import SeaLevelDataset
+
+REPEAT = 200
+
+
+def main():
+    dataset = SeaLevelDataset(load_sea_levels())
+    rows = dataset.data2
+    print(f"{'Region':<16}{'rows':>7}{'mask (us)':>12}{'slice (us)':>12}{'speedup':>9}")
+    for region in dataset.regions:
+        if region == "All":
+            masked = lambda: rows.copy()
+        else:
+            masked = lambda: rows.copy()[lambda frame: frame["Measure"] == region]
+        mask_us = min(timeit.repeat(masked, number=REPEAT, repeat=3)) / REPEAT * 1e6
+        slice_us = min(timeit.repeat(lambda: dataset.view(region), number=REPEAT, repeat=3)) / REPEAT * 1e6
+        print(f"{region:<16}{len(dataset.view(region)):>7}{mask_us:>12.1f}{slice_us:>12.1f}{mask_us / slice_us:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""First paint of a new server process, as a fresh container or replica
+sees it: from launching `streamlit run final_app.py` to the end of the
+first session's first rerun, with and without the warm-start bundle.
+
+    python -m benchmarks.bench_first_paint [--runs 3] [--app final_app.py]
+
+Builds the bundles first (see warm_start). "no bundle" points
+SEA_LEVEL_BUNDLE at an empty directory, so the dataset and the first
+page's charts are built in the first rerun as before. Each run also
+records the first rerun's stage timings (SEA_LEVEL_TIMINGS) to show where
+its time went.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import websockets
+
+import warm_start
+from benchmarks.load_test import Session, _free_port, launch_server
+
+MODES = ["bundle", "no bundle"]
+# Stages listed per mode, slowest first
+TOP_STAGES = 4
+
+
+async def _first_rerun(url):
+    origin = url.replace("ws://", "http://").split("/_stcore")[0]
+    async with websockets.connect(url, subprotocols=["streamlit"], origin=origin, max_size=None) as ws:
+        seconds, received, ok = await Session(ws, random.Random(0)).rerun()
+        if not ok:
+            raise RuntimeError("the first rerun raised an exception")
+        return seconds, received
+
+
+def first_paint(app, bundle_dir):
+    """{server_start_s, first_rerun_s, first_paint_s, bytes, stages} for one new server."""
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = os.path.join(tmp, "timings.jsonl")
+        env = {"SEA_LEVEL_BUNDLE": bundle_dir, "SEA_LEVEL_TIMINGS": "1", "SEA_LEVEL_TIMINGS_JSONL": timings}
+        port = _free_port()
+        started = time.perf_counter()
+        server = launch_server(app, port, env)
+        try:
+            ready = time.perf_counter()
+            rerun_s, received = asyncio.run(_first_rerun(f"ws://localhost:{port}/_stcore/stream"))
+            painted = time.perf_counter()
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        with open(timings) as f:
+            stages = json.loads(f.readline())["stages"]
+    return {
+        "server_start_s": ready - started,
+        "first_rerun_s": rerun_s,
+        "first_paint_s": painted - started,
+        "bytes": received,
+        "stages": stages,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--app", default="final_app.py")
+    args = parser.parse_args(argv)
+
+    warm_start.main([])
+    results = {}
+    with tempfile.TemporaryDirectory() as empty:
+        for mode in MODES:
+            bundle_dir = warm_start.BUNDLE_DIR if mode == "bundle" else empty
+            results[mode] = [first_paint(args.app, bundle_dir) for _ in range(args.runs)]
+
+    print(f"{args.app}, median of {args.runs} new servers")
+    print(f"  {'':<12}{'server up (s)':>15}{'first rerun (s)':>17}{'first paint (s)':>17}")
+    for mode, runs in results.items():
+        medians = [statistics.median(run[key] for run in runs) for key in ("server_start_s", "first_rerun_s", "first_paint_s")]
+        print(f"  {mode:<12}" + "".join(f"{value:>{width}.2f}" for value, width in zip(medians, (15, 17, 17))))
+    for mode, runs in results.items():
+        stages = sorted(runs[-1]["stages"], key=lambda stage: stage["seconds"], reverse=True)[:TOP_STAGES]
+        listed = ", ".join(f"{stage['stage']} {stage['seconds'] * 1e3:.0f} ms" for stage in stages)
+        print(f"  {mode}: {listed}")
+
+
+if __name__ == "__main__":
+    main()
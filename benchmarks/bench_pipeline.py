@@ -0,0 +1,101 @@
+"""Load, build, filter and aggregate stages on synthetic data 1x-100x the
+size of the real export. A scale of N repeats every region N times under a
+new name (as more countries/indicators would), so series keep their real
+length and shape.
+
+    python -m benchmarks.bench_pipeline [1 10 100]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from sea_level_data import load_sea_levels
+from shared_dataset import SeaLevelDataset
+
+SCALES = [1, 10, 100]
+# Regions timed per scale for the per-region stages
+SAMPLE_REGIONS = 10
+
+
+def synthetic_frame(base, scale):
+    """`base` with every region repeated `scale` times, as a compact frame."""
+    if scale == 1:
+        return base.copy()
+    copies = []
+    for k in range(scale):
+        copy = base.copy()
+        copy["Measure"] = copy["Measure"].astype(str) + ("" if k == 0 else f" #{k}")
+        copies.append(copy)
+    frame = pd.concat(copies, ignore_index=True)
+    frame["Measure"] = frame["Measure"].astype("category")
+    frame.attrs = dict(base.attrs)
+    # No source hash: nothing synthetic gets cached in the snapshot directory
+    frame.attrs.pop("source_sha256", None)
+    return frame
+
+
+def _best(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def bench_scale(base, scale):
+    frame = synthetic_frame(base, scale)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.parquet")
+        frame.to_parquet(path, index=False)
+        load = _best(lambda: pd.read_parquet(path))
+
+    started = time.perf_counter()
+    dataset = SeaLevelDataset(frame)
+    build = time.perf_counter() - started
+
+    regions = dataset.regions[1:1 + SAMPLE_REGIONS]
+    filter_s = statistics.median(_best(lambda: dataset.view(region)) for region in regions)
+    # Uncached paths: the downsampling and heatmap memos are emptied per call
+    downsample = statistics.median(
+        _best(lambda: dataset._line_rows.cache_clear() or dataset.line_rows(region)) for region in regions
+    )
+    heatmap = _best(lambda: dataset._heatmap_cells.clear() or dataset.heatmap_cells(stat="max"), repeat=1)
+    volatility = _best(lambda: dataset.year_index.top_volatile(2000, 2020, 10))
+    trends = _best(lambda: dataset.region_trends.fastest_rising(2000, 2020, 10))
+    return {
+        f"pipeline.x{scale}.rows": len(frame),
+        f"pipeline.x{scale}.load_s": load,
+        f"pipeline.x{scale}.build_s": build,
+        f"pipeline.x{scale}.filter_s": filter_s,
+        f"pipeline.x{scale}.downsample_s": downsample,
+        f"pipeline.x{scale}.heatmap_max_s": heatmap,
+        f"pipeline.x{scale}.volatility_window_s": volatility,
+        f"pipeline.x{scale}.trend_window_s": trends,
+    }
+
+
+def run(scales=SCALES):
+    base = load_sea_levels()
+    metrics = {}
+    for scale in scales:
+        metrics.update(bench_scale(base, scale))
+    return metrics
+
+
+def main(argv=None):
+    scales = [int(arg) for arg in (argv if argv is not None else sys.argv[1:])] or SCALES
+    base = load_sea_levels()
+    for scale in scales:
+        for metric, value in bench_scale(base, scale).items():
+            unit = "" if metric.endswith(".rows") else " ms"
+            value = value if metric.endswith(".rows") else value * 1e3
+            print(f"{metric:<36}{value:>12.3f}{unit}" if unit else f"{metric:<36}{value:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""Many concurrent dashboard sessions against one local Streamlit server,
+over the same websocket protocol the browser uses.
+
+    python -m benchmarks.load_test [--sessions 20] [--duration 60] [--app final_app.py]
+
+Launches `streamlit run <app>` on a free port, opens `--sessions` sessions
+at once and has each of them keep picking a random region, dragging a
+random zoom window on the overall line chart, moving the year slider or
+switching the heatmap statistic, waiting for its rerun to finish before the
+next action. Reports p50/p95/p99 rerun latency, reruns per second across
+all sessions and the server's resident memory sampled over the run, which
+is where per-session copies and per-rerun recomputation show up.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_TIMEOUT = 120
+# Longest a single rerun may take before the session counts it as failed
+RERUN_TIMEOUT = 300
+# Seconds between server memory samples
+RSS_INTERVAL = 1.0
+PERCENTILES = [50, 95, 99]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def launch_server(app, port, env=None):
+    """`streamlit run app` headless on `port` (with extra environment
+    variables `env`); returns the process once its health endpoint answers."""
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", app,
+            "--server.headless", "true",
+            "--server.port", str(port),
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=ROOT,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"streamlit exited with code {server.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://localhost:{port}/_stcore/health", timeout=1) as response:
+                if response.read() == b"ok":
+                    return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"streamlit did not come up on port {port} within {STARTUP_TIMEOUT}s")
+
+
+def rss_bytes(pid):
+    """Resident memory of `pid` from /proc (Linux), or None."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class Session:
+    """One browser tab: keeps the widget values it has set and sends all of
+    them with every rerun, as the frontend does."""
+
+    def __init__(self, ws, rng):
+        self.ws = ws
+        self.rng = rng
+        self.widgets = {}  # id -> WidgetState the session has set
+        self.regions = []
+        self.region_id = None
+        self.slider = None  # (id, min, max)
+        self.stat = None  # (id, options)
+        self.chart_id = None
+
+    async def rerun(self):
+        """Send a rerun with the current widget values and read until the
+        script finishes. Returns (seconds, bytes received, succeeded)."""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        msg.rerun_script.widget_states.widgets.extend(self.widgets.values())
+        started = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        received = 0
+        ok = True
+        while True:
+            raw = await asyncio.wait_for(self.ws.recv(), RERUN_TIMEOUT)
+            received += len(raw)
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                ok &= self._see(forward.delta.new_element)
+            elif kind == "script_finished":
+                ok &= forward.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY
+                return time.perf_counter() - started, received, ok
+
+    def _see(self, element):
+        """Note the widgets this session drives; False on a script exception."""
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            return False
+        if kind == "selectbox" and element.selectbox.label == "Region":
+            self.region_id = element.selectbox.id
+            self.regions = list(element.selectbox.options)
+        elif kind == "slider" and element.slider.label == "Years":
+            self.slider = (element.slider.id, element.slider.min, element.slider.max)
+        elif kind == "radio" and element.radio.label == "Cell value":
+            self.stat = (element.radio.id, list(element.radio.options))
+        elif kind == "vega_lite_chart" and element.vega_lite_chart.id.endswith("overall_chart"):
+            self.chart_id = element.vega_lite_chart.id
+        return True
+
+    def _set(self, widget_id, field, value):
+        state = self.widgets.setdefault(widget_id, WidgetState(id=widget_id))
+        if field == "double_array_value":
+            state.double_array_value.data[:] = value
+        else:
+            setattr(state, field, value)
+
+    def act(self):
+        """Change one widget at random; returns the action's name."""
+        actions = []
+        if self.regions:
+            actions += ["region"] * 3
+        if self.chart_id and self.slider:
+            actions += ["zoom"] * 2
+        if self.slider:
+            actions.append("years")
+        if self.stat:
+            actions.append("stat")
+        action = self.rng.choice(actions)
+        if action == "region":
+            self._set(self.region_id, "string_value", self.rng.choice(self.regions))
+            # A new region redraws the line chart at full extent
+            self.widgets.pop(self.chart_id, None)
+        elif action == "zoom":
+            # The slider spans the data's years; the chart selects in ms
+            _, low, high = self.slider
+            first, last = _epoch_ms(low), _epoch_ms(high + 1)
+            start, end = sorted(self.rng.uniform(first, last) for _ in range(2))
+            selection = {"selection": {"zoom": {"Date": [start, end]}}}
+            self._set(self.chart_id, "string_value", json.dumps(selection))
+        elif action == "years":
+            widget_id, low, high = self.slider
+            start, end = sorted(self.rng.randint(int(low), int(high)) for _ in range(2))
+            self._set(widget_id, "double_array_value", [start, end])
+        else:
+            widget_id, options = self.stat
+            self._set(widget_id, "string_value", self.rng.choice(options))
+        return action
+
+
+def _epoch_ms(year):
+    return float(np.datetime64(f"{int(year)}-01-01", "ms").astype("int64"))
+
+
+async def run_session(url, deadline, seed, results, think):
+    rng = random.Random(seed)
+    origin = url.replace("ws://", "http://").split("/_stcore")[0]
+    async with websockets.connect(url, subprotocols=["streamlit"], origin=origin, max_size=None) as ws:
+        session = Session(ws, rng)
+        seconds, received, ok = await session.rerun()
+        results["connect"].append(seconds)
+        results["errors"] += not ok
+        while time.monotonic() < deadline:
+            action = session.act()
+            seconds, received, ok = await session.rerun()
+            results["reruns"].append((action, seconds, received))
+            results["errors"] += not ok
+            if think:
+                await asyncio.sleep(rng.uniform(0, 2 * think))
+
+
+async def sample_rss(pid, started, stop, samples):
+    while not stop.is_set():
+        samples.append((time.monotonic() - started, rss_bytes(pid)))
+        try:
+            await asyncio.wait_for(stop.wait(), RSS_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def load(url, sessions, duration, pid=None, think=0.0, seed=0):
+    results = {"connect": [], "reruns": [], "errors": 0, "rss": []}
+    started = time.monotonic()
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(pid, started, stop, results["rss"])) if pid else None
+    deadline = started + duration
+    outcomes = await asyncio.gather(
+        *(run_session(url, deadline, seed + i, results, think) for i in range(sessions)),
+        return_exceptions=True,
+    )
+    results["elapsed"] = time.monotonic() - started
+    results["failed_sessions"] = [repr(o) for o in outcomes if isinstance(o, BaseException)]
+    stop.set()
+    if sampler:
+        await sampler
+    return results
+
+
+def _percentiles(seconds):
+    if not seconds:
+        return {f"p{p}_s": None for p in PERCENTILES}
+    values = np.percentile(seconds, PERCENTILES)
+    return {f"p{p}_s": float(v) for p, v in zip(PERCENTILES, values)}
+
+
+def summarize(results, sessions):
+    reruns = results["reruns"]
+    rss = [value for _, value in results["rss"] if value is not None]
+    summary = {
+        "sessions": sessions,
+        "elapsed_s": results["elapsed"],
+        "reruns": len(reruns),
+        "reruns_per_s": len(reruns) / results["elapsed"] if results["elapsed"] else 0.0,
+        "errors": results["errors"],
+        "failed_sessions": len(results["failed_sessions"]),
+        "connect": _percentiles(results["connect"]),
+        "rerun": _percentiles([seconds for _, seconds, _ in reruns]),
+        "by_action": {
+            action: _percentiles([seconds for a, seconds, _ in reruns if a == action])
+            for action in sorted({a for a, _, _ in reruns})
+        },
+        "mean_bytes_per_rerun": float(np.mean([n for _, _, n in reruns])) if reruns else 0.0,
+        "rss_start_bytes": rss[0] if rss else None,
+        "rss_peak_bytes": max(rss) if rss else None,
+        "rss_end_bytes": rss[-1] if rss else None,
+    }
+    return summary
+
+
+def _ms(value):
+    return f"{value * 1e3:9.1f}" if value is not None else f"{'-':>9}"
+
+
+def report(summary, rss_samples):
+    print(f"{summary['sessions']} sessions, {summary['elapsed_s']:.1f} s: "
+          f"{summary['reruns']} reruns, {summary['reruns_per_s']:.2f} reruns/s, "
+          f"{summary['errors']} errors, {summary['failed_sessions']} failed sessions")
+    print(f"  {'latency (ms)':<14}" + "".join(f"{'p' + str(p):>9}" for p in PERCENTILES))
+    rows = [("connect", summary["connect"]), ("rerun", summary["rerun"])]
+    rows += [(f"  {action}", p) for action, p in summary["by_action"].items()]
+    for name, p in rows:
+        print(f"  {name:<14}" + "".join(_ms(p[f"p{q}_s"]) for q in PERCENTILES))
+    print(f"  received per rerun: {summary['mean_bytes_per_rerun'] / 1e3:.1f} KB")
+    if rss_samples:
+        print(f"  {'t (s)':>8}{'RSS (MB)':>10}")
+        step = max(1, len(rss_samples) // 20)
+        for t, value in rss_samples[::step] + ([rss_samples[-1]] if (len(rss_samples) - 1) % step else []):
+            print(f"  {t:>8.1f}{(value or 0) / 1e6:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60, help="seconds of interaction after connecting")
+    parser.add_argument("--app", default="final_app.py")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between actions, in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="an already running server's ws://host:port/_stcore/stream (no RSS then)")
+    parser.add_argument("--json", help="also write the summary and RSS samples here")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        url, pid = args.url, None
+    else:
+        port = _free_port()
+        server = launch_server(args.app, port)
+        url, pid = f"ws://localhost:{port}/_stcore/stream", server.pid
+    try:
+        results = asyncio.run(load(url, args.sessions, args.duration, pid, args.think, args.seed))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    summary = summarize(results, args.sessions)
+    report(summary, results["rss"])
+    for failure in results["failed_sessions"][:5]:
+        print(f"  session failed: {failure}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({**summary, "rss": results["rss"]}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""The whole benchmark suite, checked against a saved baseline.
+
+    python -m benchmarks.suite                    # compare with baseline.json
+    python -m benchmarks.suite --update-baseline  # record a new baseline
+    python -m benchmarks.suite --quick            # skip the 100x scale
+
+Exits with status 1 when any metric is worse than its baseline by more
+than its threshold. Timings are machine-dependent: record the baseline on
+the machine that runs the comparison.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+# bench_apps first: it pins an empty warm-start bundle directory
+from benchmarks import bench_apps, bench_pipeline
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Allowed growth over the baseline, by metric suffix, as (relative, absolute)
+# slack; a metric regresses only past both. The absolute part keeps
+# sub-millisecond timings from failing on scheduler noise.
+THRESHOLDS = {
+    "_s": (0.25, 0.005),
+    "_bytes": (0.10, 4096),
+    ".rows": (0.0, 0),
+}
+
+
+def threshold(metric):
+    for suffix, slack in THRESHOLDS.items():
+        if metric.endswith(suffix):
+            return slack
+    return 0.25, 0
+
+
+def compare(metrics, baseline):
+    """[(metric, baseline, current, limit)] for every metric past its limit.
+    Metrics missing from either side are not compared."""
+    regressions = []
+    for metric, old in baseline.items():
+        if metric not in metrics:
+            continue
+        relative, absolute = threshold(metric)
+        limit = max(old * (1 + relative), old + absolute)
+        if metrics[metric] > limit:
+            regressions.append((metric, old, metrics[metric], limit))
+    return regressions
+
+
+def run(quick=False):
+    metrics = bench_apps.run()
+    metrics.update(bench_pipeline.run([1, 10] if quick else bench_pipeline.SCALES))
+    return metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--update-baseline", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--quick", action="store_true", help="leave out the 100x synthetic scale")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    args = parser.parse_args(argv)
+
+    metrics = run(args.quick)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "machine": f"{platform.machine()} {platform.python_implementation()} {platform.python_version()}",
+                "metrics": metrics,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"Saved {len(metrics)} metrics to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["metrics"]
+    print(f"{'metric':<40}{'baseline':>14}{'current':>14}{'change':>9}")
+    for metric, value in metrics.items():
+        old = baseline.get(metric)
+        change = f"{(value - old) / old:+.0%}" if old else ""
+        print(f"{metric:<40}{'' if old is None else f'{old:.4g}':>14}{value:>14.4g}{change:>9}")
+
+    regressions = compare(metrics, baseline)
+    for metric, old, value, limit in regressions:
+        print(f"REGRESSION {metric}: {value:.4g} (baseline {old:.4g}, limit {limit:.4g})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
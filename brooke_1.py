@@ -1,84 +1,64 @@
 import streamlit as st
 import altair as alt
-import pandas as pd
+from sea_level_data import XLSX_PATH
+import timing
+from charts import average_chart, debug_panel, heatmap_chart, overall_chart, show_chart, zoom_window
+from shared_dataset import HEATMAP_STATS, get_dataset
 
-# Load data
-data = pd.read_excel("sea_levels_with_years(1).xlsx")
-mapping = {
-    "Change in mean sea level: Sea level: TOPEX.Poseidon" : "Poseidon",
-    "Change in mean sea level: Sea level: Jason.1" : "Jason.1",
-    "Change in mean sea level: Sea level: Jason.2" : "Jason.2",
-    "Change in mean sea level: Sea level: Jason.3" : "Jason:3",
-    "Change in mean sea level: Sea level: Sentinel-6MF" : "Sentinel-6MF",
-    "Change in mean sea level: Sea level: Trend" : "Trend"
-}
-data["Indicator"] = data["Indicator"].replace(mapping)
+# Per-stage timings for this rerun when the sidebar debug panel is on
+timing.begin_rerun("brooke_1", st.session_state.get("debug_timings", False))
+
+# Load data (the snapshot already carries the short satellite names in "Mission")
+dataset = get_dataset(XLSX_PATH)
 
 # Sidebar
 st.sidebar.header("Filter Source")
-source = ["All"] + sorted(data["Indicator"].unique())
-region = ["All"] + sorted(data["Measure"].unique())
+source = dataset.missions
+region = dataset.regions
 
 selected_source = st.sidebar.selectbox("Data Source", source)
 selected_region = st.sidebar.selectbox("Region", region)
 
-# Apply filters for interactive views
-data2 = data[data['Year'] <= 2024]
-
-filtered = data2.copy()
-
-if selected_source != "All":
-    filtered = filtered[filtered["Indicator"] == selected_source]
-if selected_region != "All":
-    filtered = filtered[filtered["Measure"] == selected_region]
-
-
-box = alt.Chart(filtered).mark_bar().encode(
-    x=alt.X("Year:O"),
-    y=alt.Y("Measure:N", title="Region"),
-    color=alt.Color("Value:Q", scale=alt.Scale(scheme="lightgreyred"), title="Change in Mean Sea Level")
-).properties(
-    title="Mean Sea Level Change by Year Across All Measured Regions"
-).interactive()
-
-st.altair_chart(box, use_container_width=True)
+# One pre-aggregated row per (Year, Region) cell rather than every raw row
+heatmap_stat = st.radio("Cell value", HEATMAP_STATS, horizontal=True, key="heatmap_stat")
+show_chart(
+    dataset, "heatmap", (selected_region, selected_source, heatmap_stat),
+    lambda: heatmap_chart(dataset.heatmap_cells(selected_region, selected_source, stat=heatmap_stat)),
+    use_container_width=True
+)
 
 
-overall = alt.Chart(filtered).mark_line().encode(
-    x=alt.X("Date:T"),
-    y=alt.Y("Value:Q"),
-    tooltip=["Year", "Value"]
-).properties(
-    title="Sea Level Changes Over Time"
-).interactive()
+# Downsampled server-side (LTTB); zooming reruns the script and refills the
+# visible window with the same point budget (finer resolution)
+zoom_start, zoom_end = zoom_window(st.session_state.get("overall_chart"))
+show_chart(
+    dataset, "overall", (selected_region, selected_source, zoom_start, zoom_end),
+    lambda: overall_chart(dataset.line_rows(selected_region, selected_source, start=zoom_start, end=zoom_end)),
+    use_container_width=True, on_select="rerun", key="overall_chart"
+)
 
-st.altair_chart(overall, use_container_width=True)
+show_chart(
+    dataset, "average", (selected_region, selected_source),
+    lambda: average_chart(dataset.year_average(selected_region, selected_source)),
+    use_container_width=True
+)
 
-year_average = filtered.groupby("Year", as_index=False)["Value"].mean()
-year_average["Change"] = year_average["Value"].diff()
 
-average = alt.Chart(year_average).mark_line(point=True).encode(
-    x=alt.X("Year:O"),
-    y=alt.Y("Value:Q", title="Average Sea Level Change (mm)"),
-    tooltip=["Year", "Value"]
-).properties(
-    title="Average Sea Level Change by Year",
-)
+def volatility_chart():
+    volatility_by_region = dataset.volatility_all_years
 
-st.altair_chart(average, use_container_width=True)
+    top_volatile = volatility_by_region.sort_values("Volatility", ascending=False).head(10)
 
-volatility_by_region = data.groupby("Measure", as_index=False)["Value"].std()
-volatility_by_region.columns = ["Measure", "Volatility"]
+    return alt.Chart(top_volatile).mark_bar().encode(
+        x=alt.X("Volatility:Q", title="Standard Deviation (mm)"),
+        y=alt.Y("Measure:N", sort='-x', title="Region"),
+        color=alt.Color("Measure:N", legend=None),
+        tooltip=["Measure", "Volatility"]
+    ).properties(
+        title="Top 10 Most Volatile Sea Regions by Sea Level Change"
+    )
 
-top_volatile = volatility_by_region.sort_values("Volatility", ascending=False).head(10)
 
-volatility = alt.Chart(top_volatile).mark_bar().encode(
-    x=alt.X("Volatility:Q", title="Standard Deviation (mm)"),
-    y=alt.Y("Measure:N", sort='-x', title="Region"),
-    color=alt.Color("Measure:N", legend=None),
-    tooltip=["Measure", "Volatility"]
-).properties(
-    title="Top 10 Most Volatile Sea Regions by Sea Level Change"
-)
+show_chart(dataset, "volatility_all_years", (), volatility_chart, use_container_width=True)
 
-st.altair_chart(volatility, use_container_width=True)
+debug_panel()
@@ -0,0 +1,356 @@
+import contextlib
+import functools
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+from streamlit import dataframe_util
+
+import timing
+
+# Bar chart sizing for the volatility chart
+MIN_HEIGHT = 400
+MIN_WIDTH = 600
+BAR_HEIGHT = 40  # pixels per bar
+TOP_N = 10
+
+# The "Final Takeaways" section, shared by final_app.py and the static export
+TAKEAWAYS = """
+- 🌍 Sea level rise is **undeniably trending upward** across the globe.
+- 📈 Some regions, like the **Western Tropical Pacific and Indian Ocean**, are rising **faster and more erratically** than others.
+- 🔁 Year-over-year volatility underscores the importance of **region-specific analysis**.
+- 🧭 Understanding these differences is key to informing **climate adaptation strategies**, coastal planning, and risk mitigation.
+
+This dashboard is designed not only to present data, but to help frame how we interpret and respond to one of the most pressing global changes of our time. We encourage you to further interact with our data to get a sense of how sea level trends vary across regions and time, and to reflect on what these patterns might mean for the future of coastal communities worldwide.
+"""
+
+
+@functools.cache
+def _altair():
+    """altair, imported on first use. It is the slowest import of the app,
+    and a first rerun drawn from the warm-start bundle's specs (see
+    first_paint_specs) builds no chart at all."""
+    import altair as alt
+
+    alt.data_transformers.register("chart_spec_cache", _collect_arrow_dataset)
+    return alt
+
+
+def zoom_window(chart_state, param="zoom", field="Date"):
+    """(start, end) timestamps of a scale-bound interval selection, read from
+    the session state of an `st.altair_chart(..., on_select="rerun")`, or
+    (None, None) before the user has zoomed."""
+    try:
+        extent = chart_state["selection"][param][field]
+    except (KeyError, TypeError):
+        return None, None
+    if not extent or len(extent) != 2:
+        return None, None
+    unit = "ms" if isinstance(extent[0], (int, float)) else None
+    start, end = pd.to_datetime(extent, unit=unit)
+    return start, end
+
+
+def heatmap_chart(cells):
+    alt = _altair()
+    return alt.Chart(cells).mark_bar().encode(
+        x=alt.X("Year:O"),
+        y=alt.Y("Measure:N", title="Region"),
+        color=alt.Color("Value:Q", scale=alt.Scale(scheme="lightgreyred"), title="Change in Mean Sea Level"),
+        tooltip=["Year", "Measure", "Value"]
+    ).properties(
+        title="Mean Sea Level Change by Year Across All Measured Regions"
+    ).interactive()
+
+
+def overall_chart(rows):
+    alt = _altair()
+    # Zoom is a named scale-bound interval so the app can read the visible
+    # window back (see zoom_window) and re-downsample it
+    zoom = alt.selection_interval(name="zoom", bind="scales")
+    return alt.Chart(rows).mark_line().encode(
+        x=alt.X("Date:T"),
+        y=alt.Y("Value:Q"),
+        tooltip=["Year", "Value"]
+    ).add_params(
+        zoom
+    ).properties(
+        title="Sea Level Changes Over Time"
+    )
+
+
+def average_chart(year_average):
+    alt = _altair()
+    return alt.Chart(year_average).mark_line(point=True).encode(
+        x=alt.X("Year:O"),
+        y=alt.Y("Value:Q", title="Average Sea Level Change (mm)"),
+        tooltip=["Year", "Value"]
+    ).properties(
+        title="Average Sea Level Change by Year",
+    )
+
+
+def client_side_charts(dataset, stat="mean", merged=False):
+    """Heatmap over line chart with the region picked from a Vega-Lite
+    dropdown, so switching regions filters in the browser without a rerun.
+    Ships the whole-dataset heatmap cells and per-region downsampled lines
+    once; the spec does not depend on any session state."""
+    alt = _altair()
+    region_param = alt.param(
+        name="region",
+        value="All",
+        bind=alt.binding_select(options=dataset.regions, name="Region "),
+    )
+    in_region = "region == 'All' || datum.Measure == region"
+    heatmap = heatmap_chart(dataset.heatmap_cells(stat=stat, merged=merged)).transform_filter(in_region)
+    overall = overall_chart(dataset.client_line_rows(merged=merged)).transform_filter(in_region)
+    return alt.vconcat(heatmap, overall).add_params(region_param)
+
+
+def rising_chart(dataset, start_year, end_year):
+    """The regions whose sea level rose fastest over [start_year, end_year],
+    by the slope of a least-squares line through all their measurements."""
+    alt = _altair()
+    fastest = dataset.region_trends.fastest_rising(start_year, end_year, TOP_N)
+    chart_height = max(BAR_HEIGHT * max(len(fastest), 1), MIN_HEIGHT)
+    return alt.Chart(fastest).mark_bar(color='#d62728').encode(
+        x=alt.X('Rate:Q', title='Rate of Rise (mm/year)'),
+        y=alt.Y('Measure:N', sort='-x', title='Region'),
+        tooltip=[
+            'Measure',
+            alt.Tooltip('Rate:Q', format='.2f', title='Rate (mm/year)'),
+            alt.Tooltip('Acceleration:Q', format='.3f', title='Acceleration (mm/year²)'),
+        ]
+    ).properties(
+        title='Top 10 Fastest-Rising Sea Regions',
+        width=MIN_WIDTH,
+        height=chart_height
+    )
+
+
+def volatility_charts(dataset, start_year, end_year, merged=False, rising=True):
+    """The top-10 volatility and fastest-rising bar charts side by side,
+    stacked over the yearly points and average line the volatility chart
+    filters, for the years in [start_year, end_year]. With `merged`, the
+    average line follows the merged series (one record per region) rather
+    than every mission's overlapping record. Without `rising`, only the
+    volatility bars go on top (final_app2's layout)."""
+    alt = _altair()
+    top_volatile = dataset.year_index.top_volatile(start_year, end_year, TOP_N)
+    full_range = (start_year, end_year) == (dataset.first_year, dataset.last_year)
+    years = "" if full_range else f" ({start_year}–{end_year})"
+    num_bars = max(len(top_volatile), 1)
+    chart_height = max(BAR_HEIGHT * num_bars, MIN_HEIGHT)
+
+    color_scale = alt.Scale(scheme='category10')  # color scheme for volatile and final charts
+    region_select = alt.selection_point(fields=['Measure'], empty='all')
+
+    volatile_chart = alt.Chart(top_volatile).mark_bar().encode(
+        x=alt.X('Volatility:Q', title='Standard Deviation (mm)'),
+        y=alt.Y('Measure:N', sort='-x', title='Region'),
+        color=alt.Color('Measure:N', scale=color_scale, title='Region'),
+        opacity=alt.condition(region_select, alt.value(1), alt.value(0)),
+        tooltip=['Measure', 'Volatility']
+    ).add_params(
+        region_select
+    ).properties(
+        title=f'Top 10 Most Volatile Sea Regions by Sea Level Change{years}',
+        width=MIN_WIDTH,
+        height=chart_height
+    )
+
+    if merged:
+        average_per_year = dataset.merged_average_per_year
+        average_per_year = average_per_year[average_per_year['Year'].between(start_year, end_year)]
+    else:
+        average_per_year = dataset.year_index.year_means(start_year, end_year)
+    average_per_measure = dataset.average_per_measure
+    average_per_measure_top10 = average_per_measure[
+        average_per_measure['Measure'].isin(top_volatile['Measure'].tolist())
+        & average_per_measure['Year'].between(start_year, end_year)
+    ]
+
+    # Bar or point chart for individual measures
+    points = alt.Chart(average_per_measure_top10).mark_circle(opacity=0.7).encode(
+        x=alt.X('Year:O', title='Year'),
+        y=alt.Y('Value:Q'),
+        color=alt.Color('Measure:N', scale=color_scale, title='Region'),
+        tooltip=['Year', 'Measure', 'Value']
+    ).transform_filter(
+        region_select
+    )
+
+    # Average line
+    average_line = alt.Chart(average_per_year).mark_line(
+        color='black',
+        strokeWidth=3
+    ).encode(
+        x=alt.X('Year:O', title='Year'),
+        y=alt.Y('Value:Q', title='Average Sea Level Change (mm)'),
+        tooltip=['Year', 'Value']
+    )
+
+    average = 'Annual Average (missions merged)' if merged else 'Annual Average'
+    final_chart = (points + average_line).properties(
+        title=f'Yearly Sea Level Changes and {average}'
+    ).interactive()
+    if rising:
+        return (volatile_chart | rising_chart(dataset, start_year, end_year)) & final_chart
+    return volatile_chart & final_chart
+
+
+def first_paint_specs(dataset):
+    """serialize_chart() of every chart final_app.py draws before anyone
+    touches a widget, keyed on (chart id, params) as its show_chart() calls
+    look them up. The warm-start bundle ships these so a new process paints
+    its first page without importing altair or building a chart. Keep the
+    params in step with final_app.py; a mismatch only costs a normal build."""
+    start, end = dataset.first_year, dataset.last_year
+    builds = {
+        ("heatmap", ("All", "mean", False)): lambda: heatmap_chart(dataset.heatmap_cells("All", stat="mean")),
+        ("overall", ("All", None, None, False)): lambda: overall_chart(dataset.line_rows("All")),
+        ("volatility", (start, end, False)): lambda: volatility_charts(dataset, start, end),
+    }
+    return {key: serialize_chart(build()) for key, build in builds.items()}
+
+
+# Altair's theme and data transformer registries are process globals
+_altair_lock = threading.Lock()
+
+
+def _collect_arrow_dataset(data, datasets):
+    """Altair data transformer: store the frame as Arrow IPC bytes (what
+    Streamlit sends to the browser) and reference it by content hash."""
+    data_bytes = dataframe_util.convert_anything_to_arrow_bytes(data)
+    name = hashlib.sha1(data_bytes).hexdigest()
+    datasets[name] = data_bytes
+    return {"name": name}
+
+
+def serialize_chart(chart):
+    """(spec JSON without data, {dataset name: Arrow bytes}) for an Altair chart."""
+    alt = _altair()
+    datasets = {}
+    with _altair_lock, timing.stage("serialize") as s:
+        # Same as st.altair_chart: Altair's default theme sizes fight Streamlit's
+        theme = alt.theme.enable("none") if alt.theme.active == "default" else contextlib.nullcontext()
+        with theme, alt.data_transformers.enable("chart_spec_cache", datasets=datasets):
+            spec = chart.to_dict()
+            s.bytes = sum(len(data) for data in datasets.values())
+    datasets = {**spec.pop("datasets", {}), **datasets}
+    return json.dumps(spec), datasets
+
+
+class ChartSpecCache:
+    """LRU cache of serialized Vega-Lite specs keyed on (chart id, filter
+    params, data version), capped by entry count and total bytes.
+
+    A hit skips building the Altair objects, their data tables and the Arrow
+    serialization; only the small spec JSON is parsed again so Streamlit can
+    take it apart without touching the cached copy.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 << 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def spec(self, chart_id, params, version, build, serialized=None):
+        """The spec for the key, from the cache, else from `serialized` (a
+        serialize_chart() result made ahead of time) if given, else built."""
+        key = (chart_id, params, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if entry is None:
+            if serialized is not None:
+                timing.count("spec_bundle_hit")
+                spec_json, datasets = serialized
+            else:
+                timing.count("spec_cache_miss")
+                with timing.stage("chart_build"):
+                    chart = build()
+                spec_json, datasets = serialize_chart(chart)
+            size = len(spec_json) + sum(len(data) for data in datasets.values() if isinstance(data, bytes))
+            entry = (spec_json, datasets, size)
+            with self._lock:
+                self.misses += 1
+                if key not in self._entries:
+                    self._entries[key] = entry
+                    self.bytes += size
+                    self._evict()
+        else:
+            timing.count("spec_cache_hit")
+        spec_json, datasets, _ = entry
+        spec = json.loads(spec_json)
+        if datasets:
+            spec["datasets"] = dict(datasets)
+        return spec
+
+    def _evict(self):
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+@st.cache_resource
+def spec_cache():
+    """The process-wide chart spec cache."""
+    return ChartSpecCache()
+
+
+def show_chart(dataset, chart_id, params, build, **kwargs):
+    """Render the chart `build()` returns, reusing its cached spec when the
+    chart id, `params` (everything the chart depends on) and data version
+    are unchanged. Extra arguments go to `st.vega_lite_chart`."""
+    params = tuple(params)
+    serialized = dataset.chart_specs.get((chart_id, params))
+    spec = spec_cache().spec(chart_id, params, dataset.version, build, serialized)
+    with timing.stage("render") as s:
+        if s.active:
+            data = spec.get("datasets", {})
+            spec_only = {key: value for key, value in spec.items() if key != "datasets"}
+            s.bytes = len(json.dumps(spec_only)) + sum(len(v) for v in data.values() if isinstance(v, bytes))
+        return st.vega_lite_chart(spec, **kwargs)
+
+
+def debug_panel():
+    """End the rerun timing started with timing.begin_rerun() and, if the
+    session turned it on, show where the time went in the sidebar. Call it
+    last in the script; the toggle's state is read at the top of the next
+    rerun, so timing starts from the one after it is switched on."""
+    rerun = timing.end_rerun()
+    if not st.sidebar.toggle("Show stage timings", key="debug_timings") or rerun is None:
+        return
+    table = pd.DataFrame(rerun.table(), columns=["stage", "calls", "seconds", "rows", "bytes"])
+    table["ms"] = (table.pop("seconds") * 1000).round(2)
+    with st.sidebar.expander("Timings", expanded=True):
+        st.caption(f"Rerun took {rerun.total_seconds * 1000:.0f} ms")
+        st.dataframe(table[["stage", "ms", "calls", "rows", "bytes"]], hide_index=True)
+        st.caption("Chart spec cache: " + ", ".join(f"{k} {v}" for k, v in spec_cache().stats().items()))
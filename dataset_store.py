@@ -0,0 +1,179 @@
+import hashlib
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from sea_level_data import (
+    CATEGORY_COLUMNS, SNAPSHOT_DIR, _dump_json, _read_meta, _write_atomic,
+    default_source, ensure_snapshots, load_sea_levels, restore_values, value_decimals,
+)
+
+# Many exports (one per country and climate indicator) in one directory tree:
+#   store/ISO3=WLD/CTS Code=ECCL/<export name>.parquet
+# plus manifest.json listing every partition, so a query opens only the
+# directory it asks for and its cost does not grow with the rest of the store.
+STORE_DIR = os.path.join(SNAPSHOT_DIR, "store")
+PARTITION_COLUMNS = ["ISO3", "CTS Code"]
+# Columns kept in the partition files; the partition keys live in the path
+STORE_COLUMNS = ["Measure", "Indicator", "Mission", "Date", "Year", "Value"]
+# Per-partition labels kept in the manifest for pickers and chart titles
+LABEL_COLUMNS = ["Country", "CTS Name", "Unit"]
+# Rows per Parquet row group. Files are sorted by region, so a Measure filter
+# can skip most row groups from their min/max statistics alone.
+ROW_GROUP_ROWS = 4096
+
+
+def manifest_path(store_dir=STORE_DIR):
+    return os.path.join(store_dir, "manifest.json")
+
+
+def read_manifest(store_dir=STORE_DIR):
+    """{"partitions": {"ISO3/CTS Code": {...}}}; empty for a new store."""
+    return _read_meta(manifest_path(store_dir)) or {"partitions": {}}
+
+
+def partition_dir(country, indicator, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f"ISO3={country}", f"CTS Code={indicator}")
+
+
+def _column_or_constant(data, col):
+    """Per-row values of `col`, whether compact_frame kept it as a column or
+    moved it to the constants because the whole export shares one value."""
+    if col in data:
+        return data[col].astype(str)
+    value = data.attrs.get("constants", {}).get(col)
+    return pd.Series(value, index=data.index, dtype=object)
+
+
+def add_source(source=None, store_dir=STORE_DIR):
+    """Split an export into its (country, indicator) partitions and write one
+    file per partition, replacing that export's previous files. Returns the
+    partition keys it wrote. Reuses the export's snapshot (load_sea_levels)."""
+    source = source or default_source()
+    data = load_sea_levels(source)
+    name = os.path.basename(source)
+    sha256 = data.attrs.get("source_sha256", "")
+    exact = data.assign(Value=restore_values(data["Value"], data.attrs.get("value_decimals")))
+    keys = pd.DataFrame({col: _column_or_constant(data, col) for col in PARTITION_COLUMNS + LABEL_COLUMNS})
+
+    manifest = read_manifest(store_dir)
+    partitions = manifest["partitions"]
+    # Drop what this export wrote before, in case a country or indicator went away
+    for key, entry in list(partitions.items()):
+        if name in entry["files"]:
+            os.remove(os.path.join(store_dir, entry["files"].pop(name)["path"]))
+            if not entry["files"]:
+                del partitions[key]
+
+    written = []
+    for (country, indicator), index in keys.groupby(PARTITION_COLUMNS, sort=True).groups.items():
+        part = exact.loc[index, STORE_COLUMNS].sort_values(["Measure", "Mission", "Date"], kind="stable")
+        directory = partition_dir(country, indicator, store_dir)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name + ".parquet")
+        _write_atomic(path, lambda tmp: part.to_parquet(tmp, index=False, row_group_size=ROW_GROUP_ROWS))
+
+        labels = keys.loc[index[0], LABEL_COLUMNS]
+        key = f"{country}/{indicator}"
+        entry = partitions.setdefault(key, {"country": country, "indicator": indicator, "files": {}})
+        entry.update({col: None if pd.isna(labels[col]) else labels[col] for col in LABEL_COLUMNS})
+        entry["files"][name] = {
+            "path": os.path.relpath(path, store_dir),
+            # The partition's own identity; partitions cut from one export differ
+            "sha256": _partition_file_sha256(sha256, country, indicator),
+            "source_sha256": sha256,
+            "rows": len(part),
+        }
+        written.append((country, indicator))
+
+    _write_atomic(manifest_path(store_dir), lambda tmp: _dump_json(manifest, tmp))
+    return written
+
+
+def ensure_store(sources=None, store_dir=STORE_DIR):
+    """add_source() for every export whose current contents are not in the
+    store yet. Cheap when nothing changed: the snapshot check is mtime-based."""
+    stored = {
+        name: file.get("source_sha256")
+        for entry in read_manifest(store_dir)["partitions"].values()
+        for name, file in entry["files"].items()
+    }
+    sources = sources or [default_source()]
+    for source, meta in zip(sources, ensure_snapshots(sources)):
+        # Appended releases (sea_level_data.append_rows) change the data but not the source
+        if stored.get(os.path.basename(source)) != meta.get("data_sha256", meta["sha256"]):
+            add_source(source, store_dir)
+    return read_manifest(store_dir)
+
+
+def partitions(store_dir=STORE_DIR):
+    """One row per (country, indicator) in the store, with its labels."""
+    entries = read_manifest(store_dir)["partitions"].values()
+    return pd.DataFrame(
+        [{k: entry[k] for k in ["country", "indicator"] + LABEL_COLUMNS} for entry in entries],
+        columns=["country", "indicator"] + LABEL_COLUMNS,
+    )
+
+
+def query(country="WLD", indicator="ECCL", columns=None, filters=None, store_dir=STORE_DIR):
+    """Rows of one (country, indicator) partition, reading only `columns`
+    (default: all of STORE_COLUMNS) and only the row groups that can match
+    `filters` (pyarrow's [(column, op, value), ...] form), e.g.
+
+        query("WLD", "ECCL", ["Measure", "Date", "Year", "Value"],
+              filters=[("Year", "<=", 2024)])
+
+    The frame comes back compact (categorical labels, float32 `Value` when
+    lossless) with the same attrs as load_sea_levels(): `source_sha256`
+    identifies the partition's files, `constants` holds its labels.
+    """
+    entry = read_manifest(store_dir)["partitions"].get(f"{country}/{indicator}")
+    if entry is None:
+        raise KeyError(f"No data for country {country!r} and indicator {indicator!r} in {store_dir}")
+    files = sorted(entry["files"].values(), key=lambda file: file["path"])
+    sha256 = _files_sha256(files)
+    table = pq.read_table(
+        [os.path.join(store_dir, file["path"]) for file in files],
+        columns=columns,
+        filters=filters,
+    )
+    data = table.to_pandas()
+    for col in CATEGORY_COLUMNS:
+        if col in data and not isinstance(data[col].dtype, pd.CategoricalDtype):
+            data[col] = data[col].astype("category")
+
+    constants = {"ISO3": country, "CTS Code": indicator, **{col: entry.get(col) for col in LABEL_COLUMNS}}
+    data.attrs["constants"] = constants
+    data.attrs["source_sha256"] = sha256
+    if "Value" in data:
+        data = _narrow_values(data)
+    return data
+
+
+def _partition_file_sha256(source_sha256, country, indicator):
+    return hashlib.sha256(f"{source_sha256} {country} {indicator}".encode()).hexdigest()
+
+
+def _files_sha256(files):
+    if len(files) == 1:
+        return files[0]["sha256"]
+    return hashlib.sha256(" ".join(file["sha256"] for file in files).encode()).hexdigest()
+
+
+def partition_sha256(country="WLD", indicator="ECCL", store_dir=STORE_DIR):
+    """The `source_sha256` query() would give the partition, from the
+    manifest alone; None if the store does not have it."""
+    entry = read_manifest(store_dir)["partitions"].get(f"{country}/{indicator}")
+    if entry is None:
+        return None
+    return _files_sha256(sorted(entry["files"].values(), key=lambda file: file["path"]))
+
+
+def _narrow_values(data):
+    """float32 `Value` plus `value_decimals`, as compact_frame() stores it."""
+    decimals = value_decimals(data["Value"])
+    if decimals is not None:
+        data["Value"] = data["Value"].astype("float32")
+    data.attrs["value_decimals"] = decimals
+    return data
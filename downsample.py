@@ -0,0 +1,49 @@
+import numpy as np
+
+# Default number of points the "Sea Level Changes Over Time" chart ships to
+# the browser, shared out between the series it shows
+LINE_POINT_BUDGET = 2000
+# Per-region budget when every region's line is sent at once for filtering
+# in the browser
+CLIENT_REGION_POINT_BUDGET = 300
+
+
+def lttb(x, y, n_out):
+    """Indices of the `n_out` points Largest-Triangle-Three-Buckets keeps.
+
+    The first and last points always survive; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point
+    and the average of the next bucket, which preserves peaks and troughs.
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype("int64")
+    keep = np.empty(n_out, dtype="int64")
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample_runs(x, y, runs, budget):
+    """Row positions to keep when each [start, stop) run in `runs` is its own
+    x-sorted series. The budget is split in proportion to series length."""
+    total = sum(stop - start for start, stop in runs)
+    if total <= budget:
+        return np.concatenate([np.arange(start, stop) for start, stop in runs] or [np.array([], dtype="int64")])
+    kept = []
+    for start, stop in runs:
+        share = max(3, int(round(budget * (stop - start) / total)))
+        kept.append(start + lttb(x[start:stop], y[start:stop], share))
+    return np.concatenate(kept)
@@ -1,30 +1,47 @@
 import streamlit as st
-import altair as alt
-import pandas as pd
+import timing
+from charts import TAKEAWAYS, client_side_charts, debug_panel, heatmap_chart, overall_chart, show_chart, volatility_charts, zoom_window
+from shared_dataset import HEATMAP_STATS, available_partitions, get_refresher
 # pyright: ignore[reportMissingImports]
-# Load data
-data = pd.read_csv("sea_levels_with_years.csv")
-
 st.set_page_config(layout="wide", page_title="Rising Waters: A Closer Look at Sea Level Changes")
+# Per-stage timings for this rerun when the sidebar debug panel is on
+timing.begin_rerun("final_app", st.session_state.get("debug_timings", False))
+
+# Load data (one read-only copy per process, shared by every session and
+# refreshed in the background). Each country/indicator is its own partition
+# of the dataset store; the picker only shows up once the store holds more
+# than one.
+partitions = available_partitions()
+partition = 0
+if len(partitions) > 1:
+    labels = (partitions["Country"] + ": " + partitions["CTS Name"]).tolist()
+    partition = st.sidebar.selectbox("Dataset", partitions.index, format_func=labels.__getitem__)
+refresher = get_refresher(country=partitions["country"][partition], indicator=partitions["indicator"][partition])
+# Read once: the whole rerun draws from this snapshot even if a refresh lands
+dataset = refresher.current
 
 # Sidebar
 st.sidebar.header("Choose a Region To View")
 #source = ["All"] + sorted(data["Indicator"].unique())
-region = ["All"] + sorted(data["Measure"].unique())
+region = dataset.regions
 
 st.sidebar.subheader("The first two charts are connected to the region selected and will display corresponding data.")
 #selected_source = st.sidebar.selectbox("Data Source", source)
-selected_region = st.sidebar.selectbox("Region", region)
-
-# Apply filters for interactive views
-data2 = data[data['Year'] <= 2024]
-
-filtered = data2.copy()
+# In browser mode the first two charts ship once with a Vega-Lite region
+# dropdown, so switching regions needs no rerun at all
+client_side = st.sidebar.toggle("Filter regions in the browser", key="client_side")
+if client_side:
+    st.sidebar.caption("Pick the region from the dropdown under the charts.")
+    selected_region = "All"
+else:
+    selected_region = st.sidebar.selectbox("Region", region)
+# One offset-corrected series per region instead of every satellite's
+# overlapping record: fewer rows, no duplicated measurements
+merged = st.sidebar.toggle("Merge satellite missions", key="merged")
+st.sidebar.caption(f"Data version {dataset.version} (loaded in {refresher.refresh_seconds:.1f}s)")
 
 #if selected_source != "All":
   #  filtered = filtered[filtered["Indicator"] == selected_source]
-if selected_region != "All":
-    filtered = filtered[filtered["Measure"] == selected_region]
 
 # Introduction
 st.title("🌊 Rising Waters: A Closer Look at Sea Level Changes")
@@ -41,139 +58,65 @@ st.markdown("")
 st.header("📍 Annual Sea Level Changes by Region")
 st.markdown("This heatmap shows how sea levels have shifted across regions and years. Darker colors represent **greater sea level increases**. Use the sidebar to select a specific region for closer inspection.")
 
-heatmap = alt.Chart(filtered).mark_bar().encode(
-    x=alt.X("Year:O"),
-    y=alt.Y("Measure:N", title="Region"),
-    color=alt.Color("Value:Q", scale=alt.Scale(scheme="lightgreyred"), title="Change in Mean Sea Level")
-).properties(
-    title="Mean Sea Level Change by Year Across All Measured Regions"
-).interactive()
-
-st.altair_chart(heatmap, use_container_width=True)
+# One pre-aggregated row per (Year, Region) cell rather than every raw row
+heatmap_stat = st.radio("Cell value", HEATMAP_STATS, horizontal=True, key="heatmap_stat")
+if client_side:
+    show_chart(
+        dataset, "client_side", (heatmap_stat, merged),
+        lambda: client_side_charts(dataset, heatmap_stat, merged),
+        use_container_width=True
+    )
+else:
+    show_chart(
+        dataset, "heatmap", (selected_region, heatmap_stat, merged),
+        lambda: heatmap_chart(dataset.heatmap_cells(selected_region, stat=heatmap_stat, merged=merged)),
+        use_container_width=True
+    )
 
 st.markdown("The heatmap above displays sea level change across different regions over time. We observe that while most regions exhibit an upward trend, the **intensity and timing vary considerably**. Some regions like the Western Pacific show **early and consistent rises**, while others demonstrate **intermittent or delayed changes**.")
 
 # Line / Frequency Chart
 st.header("📈 Global Sea Level Trends Over Time")
 st.markdown("The line chart below illustrates **overall sea level trends** across all measured regions. It provides a clearer view of how the global mean sea level has shifted each year.")
-overall = alt.Chart(filtered).mark_line().encode(
-    x=alt.X("Date:T"),
-    y=alt.Y("Value:Q"),
-    tooltip=["Year", "Value"]
-).properties(
-    title="Sea Level Changes Over Time"
-).interactive()
-
-st.altair_chart(overall)
+# Downsampled server-side (LTTB); zooming reruns the script and refills the
+# visible window with the same point budget (finer resolution). In browser
+# mode the line chart is already drawn under the heatmap.
+if not client_side:
+    zoom_start, zoom_end = zoom_window(st.session_state.get("overall_chart"))
+    show_chart(
+        dataset, "overall", (selected_region, zoom_start, zoom_end, merged),
+        lambda: overall_chart(dataset.line_rows(selected_region, start=zoom_start, end=zoom_end, merged=merged)),
+        on_select="rerun", key="overall_chart"
+    )
 
 st.markdown("This line chart shows the **global average sea level change** over time. We see a **general upward trend**, with some years exhibiting sharper increases than others. This suggests that sea level rise is not only ongoing but **subject to short-term variability**, possibly due to climatic cycles or regional anomalies.")
 
-year_average = filtered.groupby("Year", as_index=False)["Value"].mean()
-year_average["Change"] = year_average["Value"].diff()
-
 # Volatility Bar Chart
 st.header("🌐 Regional Volatility in Sea Level Change")
 st.markdown("Not all regions experience sea level change equally. Below, we highlight the **10 most volatile regions**, meaning they have the **highest standard deviation in sea level change**. Click a region to explore its pattern over time.")
-average = alt.Chart(year_average).mark_line(point=True).encode(
-    x=alt.X("Year:O"),
-    y=alt.Y("Value:Q", title="Average Sea Level Change (mm)"),
-    tooltip=["Year", "Value"]
-).properties(
-    title="Average Sea Level Change by Year",
-)
-
 st.markdown("The bar chart highlights the **top 10 most volatile regions**, measured by the standard deviation in their annual sea level change. Volatility here reflects how **inconsistent or fluctuating** sea levels have been in each region. This matters because **volatile regions may face unpredictable flooding risks**, complicating long-term planning.")
+st.markdown("Next to it, the **10 fastest-rising regions** are ranked by their average **rate of rise in mm per year** over the selected years. Hover over a bar to see whether that rise is **accelerating** (positive) or slowing down (negative).")
 
-
-# Always use the full dataset for volatility calculation
-volatility_by_region = data2.groupby('Measure', as_index=False)['Value'].std()
-volatility_by_region.columns = ['Measure', 'Volatility']
-
-top_volatile = volatility_by_region.sort_values('Volatility', ascending=False).head(10)
-# Step 3: Create Altair bar chart
-min_height = 400
-min_width = 600
-chart_width = min_width  # pixels
-bar_height = 40  # pixels per bar
-num_bars = max(len(top_volatile), 1)
-chart_height = max(bar_height * num_bars, min_height)
-
-data2.loc[:, 'Measure'] = data2['Measure'].str.strip()
-top_volatile.loc[:, 'Measure'] = top_volatile['Measure'].str.strip()
-
-color_scale = alt.Scale(scheme='category10')  # color scheme for volatile and final charts
-region_select = alt.selection_point(fields=['Measure'], empty='all')
-
-volatile_chart = alt.Chart(top_volatile).mark_bar().encode(
-    x=alt.X('Volatility:Q', title='Standard Deviation (mm)'),
-    y=alt.Y('Measure:N', sort='-x', title='Region'),
-    color=alt.Color('Measure:N', scale=color_scale, title='Region'),
-    opacity=alt.condition(region_select, alt.value(1), alt.value(0)),
-    tooltip=['Measure', 'Volatility']
-).add_params(
-    region_select 
-).properties(
-    title='Top 10 Most Volatile Sea Regions by Sea Level Change',
-    width=chart_width,
-    height=chart_height
+# Year window for the volatility and average charts; each drag is answered
+# from the dataset's prefix-sum index instead of regrouping the raw rows
+start_year, end_year = st.slider(
+    "Years", dataset.first_year, dataset.last_year, (dataset.first_year, dataset.last_year)
 )
 
-#st.altair_chart(volatile_chart)
-
-# Average per year chart
-#average_per_year = filtered_dataset.groupby('Year', as_index=False)['Value'].mean()
-average_per_year = data[data['Year'] <= 2024].groupby('Year', as_index=False)['Value'].mean()
-top_10_measures = top_volatile['Measure'].tolist()
-average_per_measure = data2.groupby(['Year', 'Measure'], as_index=False)['Value'].mean()
-average_per_measure_top10 = average_per_measure[average_per_measure['Measure'].isin(top_10_measures)]
-
-
-#average_per_measure.loc[:, 'Measure'] = average_per_measure['Measure'].str.strip()
-
-#average_per_measure = filtered.groupby(['Year', 'Measure'], as_index=False)['Value'].mean()
-# Bar or point chart for individual measures
-points = alt.Chart(average_per_measure_top10).mark_circle(opacity=0.7).encode(
-    x=alt.X('Year:O', title='Year'),
-    y=alt.Y('Value:Q'),
-     color=alt.Color('Measure:N', scale=color_scale, title='Region'),
-    tooltip=['Year', 'Measure', 'Value']
-).transform_filter(
-    region_select
-)
-
-# Average line
-average_line = alt.Chart(average_per_year).mark_line(
-    color='black',
-    strokeWidth=3
-).encode(
-    x=alt.X('Year:O', title='Year'),
-    y=alt.Y('Value:Q', title='Average Sea Level Change (mm)'),
-    tooltip=['Year', 'Value']
-)
-
-# Combine
-final_chart = (points + average_line).properties(
-    title='Yearly Sea Level Changes and Annual Average'
-).interactive()
-#st.altair_chart(final_chart, use_container_width=True)
 
 
 st.write("*Pick a region from the top 10 most volatile sea regions. Then, scroll down and examine how their volatility compares to the yearly average of all sea regions each year.*")
-st.altair_chart(volatile_chart & final_chart, use_container_width=True)
+# The volatility charts only depend on the year window and the merge toggle, not the sidebar region
+show_chart(
+    dataset, "volatility", (start_year, end_year, merged),
+    lambda: volatility_charts(dataset, start_year, end_year, merged),
+    use_container_width=True
+)
 
 st.markdown("In this final chart, we compare selected volatile regions to the **global average sea level change**. Each colored dot represents a region’s sea level in a specific year, while the **black line shows the global average**. This makes it easy to see **which regions spike above or fall below the global trend** — reinforcing the idea that while the sea is rising everywhere, **some regions experience it faster and more erratically**.")
 
 # Key Takeaways
 st.header("🔍 Final Takeaways")
-st.markdown("""
-- 🌍 Sea level rise is **undeniably trending upward** across the globe.
-- 📈 Some regions, like the **Western Tropical Pacific and Indian Ocean**, are rising **faster and more erratically** than others.
-- 🔁 Year-over-year volatility underscores the importance of **region-specific analysis**.
-- 🧭 Understanding these differences is key to informing **climate adaptation strategies**, coastal planning, and risk mitigation.
-
-This dashboard is designed not only to present data, but to help frame how we interpret and respond to one of the most pressing global changes of our time. We encourage you to further interact with our data to get a sense of how sea level trends vary across regions and time, and to reflect on what these patterns might mean for the future of coastal communities worldwide.
-""")
-
-
+st.markdown(TAKEAWAYS)
 
-   
\ No newline at end of file
+debug_panel()
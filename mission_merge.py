@@ -0,0 +1,116 @@
+import glob
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from sea_level_data import SNAPSHOT_DIR, _write_atomic
+
+# Satellite missions in the order they took over the reference orbit. The
+# "Trend" indicator is a published rate rather than a sea level, so it is
+# not part of the merged record.
+MISSION_ORDER = ["Poseidon", "Jason.1", "Jason.2", "Jason.3", "Sentinel-6MF"]
+MERGED_MISSION = "Merged"
+# Bump when merge_missions() changes so cached merged series get rebuilt
+MERGE_VERSION = 1
+# Merged series (one per input frame) kept in the snapshot directory; the
+# least recently written are pruned
+MERGED_KEEP = 4
+
+
+def mission_offsets(frame):
+    """One row per (Measure, Mission) record with its date span and the
+    offset to subtract from its values to put it on one continuous record.
+
+    Each step is the difference between the two missions' mean `Value`
+    over the window where both were measuring (the newer mission's start to
+    the older one's end). Steps add up along each region's missions, and
+    every mission is brought to the level of the newest one, so the recent
+    values stay as published. Records that do not overlap their predecessor
+    get a zero step.
+    """
+    levels = frame[frame["Mission"].isin(MISSION_ORDER)]
+    rank = pd.Categorical(levels["Mission"].astype(str), categories=MISSION_ORDER).codes
+    keys = pd.DataFrame({"Measure": levels["Measure"].astype(str).to_numpy(), "rank": rank})
+
+    spans = levels.groupby([keys["Measure"].to_numpy(), rank])["Date"].agg(["min", "max"])
+    spans.index.names = ["Measure", "rank"]
+    spans = spans.reset_index()
+    same_region = spans["Measure"].eq(spans["Measure"].shift())
+    spans["prev_end"] = spans["max"].shift().where(same_region)
+    spans["next_start"] = spans["min"].shift(-1).where(spans["Measure"].eq(spans["Measure"].shift(-1)))
+
+    # Attach every row to its record, then average each side of each overlap
+    record = pd.MultiIndex.from_frame(keys)
+    position = pd.MultiIndex.from_frame(spans[["Measure", "rank"]]).get_indexer(record)
+    dates = levels["Date"].to_numpy()
+    values = levels["Value"].to_numpy(dtype="float64")
+    overlaps_prev = dates <= spans["prev_end"].to_numpy()[position]
+    overlaps_next = dates >= spans["next_start"].to_numpy()[position]
+
+    def side_mean(mask):
+        count = np.bincount(position[mask], minlength=len(spans))
+        total = np.bincount(position[mask], values[mask], minlength=len(spans))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(count > 0, total / count, np.nan)
+
+    new_side = side_mean(overlaps_prev)
+    # The older mission's side of record k's overlap is its predecessor's
+    # overlap with its successor
+    old_side = pd.Series(side_mean(overlaps_next)).shift().where(same_region).to_numpy()
+    step = np.nan_to_num(new_side - old_side)
+    spans["step"] = step
+    steps = spans.groupby("Measure")["step"]
+    spans["offset"] = steps.cumsum() - steps.transform("sum")
+    spans["Mission"] = np.asarray(MISSION_ORDER, dtype=object)[spans["rank"]]
+    return spans[["Measure", "Mission", "min", "max", "next_start", "step", "offset"]].rename(
+        columns={"min": "start", "max": "end"}
+    )
+
+
+def merge_missions(frame, offsets=None):
+    """One continuous series per region: each mission's offset-corrected
+    rows up to the start of the next mission, which takes over from there.
+    `Mission` is MERGED_MISSION throughout and `Source` keeps the mission
+    each row came from. Sorted by (Measure, Date)."""
+    offsets = mission_offsets(frame) if offsets is None else offsets
+    levels = frame[frame["Mission"].isin(MISSION_ORDER)]
+    keys = pd.MultiIndex.from_arrays([levels["Measure"].astype(str), levels["Mission"].astype(str)])
+    position = pd.MultiIndex.from_frame(offsets[["Measure", "Mission"]]).get_indexer(keys)
+    next_start = offsets["next_start"].to_numpy()[position]
+    keep = pd.isna(next_start) | (levels["Date"].to_numpy() < next_start)
+
+    merged = levels.loc[keep].assign(
+        Value=levels["Value"].to_numpy(dtype="float64")[keep] - offsets["offset"].to_numpy()[position][keep],
+        Source=levels["Mission"][keep].astype(str),
+        Mission=MERGED_MISSION,
+    )
+    merged["Mission"] = merged["Mission"].astype("category")
+    merged["Source"] = merged["Source"].astype("category")
+    return merged.sort_values(["Measure", "Date"], kind="stable").reset_index(drop=True)
+
+
+def _merged_path(version, frame):
+    # The version alone is not enough: partitions of one export, or frames
+    # cut differently from one snapshot, share it
+    rows = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    digest = hashlib.sha256(rows.tobytes()).hexdigest()[:12]
+    return os.path.join(SNAPSHOT_DIR, f"merged-v{MERGE_VERSION}-{version}-{digest}.parquet")
+
+
+def load_merged(frame, version):
+    """merge_missions(frame), cached in the snapshot directory under the
+    data `version` (its source hash) and a hash of `frame`'s rows, so it is
+    computed once per input rather than once per process."""
+    path = _merged_path(version, frame)
+    if version and os.path.exists(path):
+        return pd.read_parquet(path)
+    merged = merge_missions(frame)
+    if version:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        _write_atomic(path, lambda tmp: merged.to_parquet(tmp, index=False))
+        cached = sorted(glob.glob(os.path.join(SNAPSHOT_DIR, "merged-*.parquet")), key=os.path.getmtime)
+        for old in cached[:-MERGED_KEEP]:
+            os.remove(old)
+    return merged
@@ -0,0 +1,296 @@
+"""Read-only HTTP API for the tables behind the dashboard.
+
+    python query_api.py [--host 127.0.0.1] [--port 8600]
+
+    GET /yearly-averages      Year, Value: mean over all (or the given) regions
+    GET /volatility           Measure, count, Mean, Volatility per region, most volatile first
+    GET /region-yearly-means  Year, Measure, Value: each region's mean per year
+    GET /partitions           the (country, indicator) datasets in the store
+
+Query parameters, all optional:
+
+    country, indicator  dataset store partition (ISO3 and CTS code; default WLD, ECCL).
+                        `indicator` is the climate indicator, not the satellite
+    mission             one satellite record (Mission, e.g. Jason.3) to average
+                        over instead of all of them pooled
+    region              a region (Measure) to keep; repeat it for several
+    start, end          year window, inclusive (default: every year up to MAX_YEAR)
+    limit               at most this many rows, a positive number (volatility only)
+
+Answers come from the same SeaLevelDataset the apps use, kept current by a
+DatasetRefresher per partition, so they match what the dashboard draws.
+Responses are JSON carrying the data `version`; the ETag is derived from
+that version and the query, so a poll with If-None-Match is answered 304
+without computing anything. Bodies are cached in-process (LRU) per data
+version and gzip-compressed for clients that accept it.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import dataset_store
+from sea_level_data import default_source
+from sea_level_stats import YearRangeIndex
+from shared_dataset import MAX_YEAR, DatasetRefresher
+
+DEFAULT_PARTITION = ("WLD", "ECCL")
+# Bodies kept by the result cache, across endpoints, queries and partitions
+RESULT_CACHE_ENTRIES = 512
+# Smaller bodies are sent uncompressed; gzip would not pay for itself
+GZIP_MIN_BYTES = 1024
+
+
+class ResultCache:
+    """LRU cache of response bodies (JSON bytes and, for large ones, their
+    gzip) keyed on (endpoint, partition, data version, query)."""
+
+    def __init__(self, max_entries=RESULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        body = build()
+        entry = (body, gzip.compress(body, mtime=0) if len(body) >= GZIP_MIN_BYTES else None)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _years(dataset, query):
+    try:
+        start = int(query.get("start", [dataset.first_year])[0])
+        end = int(query.get("end", [dataset.last_year])[0])
+    except ValueError:
+        raise BadRequest("start and end must be years") from None
+    return start, end
+
+
+def _cube(dataset, query):
+    """The dataset's yearly cube, cut to the query's mission if it has one."""
+    mission = query.get("mission", ["All"])
+    if len(mission) > 1:
+        raise BadRequest("give at most one mission")
+    if mission[0] not in dataset.missions:
+        raise BadRequest(f"mission must be one of {', '.join(dataset.missions)}")
+    return dataset.cube2.select(mission=mission[0])
+
+
+def _year_index(dataset, query):
+    if query.get("mission", ["All"]) == ["All"]:
+        return dataset.year_index
+    cube = _cube(dataset, query)
+    if cube.cells.empty:
+        raise BadRequest(f"no rows for mission {query['mission'][0]} up to {MAX_YEAR}")
+    return YearRangeIndex(cube)
+
+
+def yearly_averages(dataset, query):
+    start, end = _years(dataset, query)
+    return _year_index(dataset, query).year_means(start, end, regions=query.get("region"))
+
+
+def volatility(dataset, query):
+    start, end = _years(dataset, query)
+    stats = _year_index(dataset, query).region_stats(start, end)
+    stats = stats[stats["count"] > 0]
+    if "region" in query:
+        stats = stats[stats["Measure"].isin(query["region"])]
+    stats = stats.sort_values("Volatility", ascending=False)
+    if "limit" in query:
+        try:
+            limit = int(query["limit"][0])
+        except ValueError:
+            raise BadRequest("limit must be a number") from None
+        if limit <= 0:
+            raise BadRequest("limit must be positive")
+        stats = stats.head(limit)
+    return stats.astype({"count": "int64"})
+
+
+def region_yearly_means(dataset, query):
+    start, end = _years(dataset, query)
+    if query.get("mission", ["All"]) == ["All"]:
+        means = dataset.average_per_measure
+    else:
+        means = _cube(dataset, query).mean(["Year", "Measure"])
+    means = means[means["Year"].between(start, end)]
+    if "region" in query:
+        means = means[means["Measure"].isin(query["region"])]
+    return means
+
+
+ENDPOINTS = {
+    "/yearly-averages": yearly_averages,
+    "/volatility": volatility,
+    "/region-yearly-means": region_yearly_means,
+}
+# Parameters that select rows; anything else is ignored (and not part of the cache key)
+QUERY_PARAMS = {"mission", "region", "start", "end", "limit"}
+
+
+class QueryService:
+    """The datasets (one refresher per partition, started on first use) and
+    the result cache behind the HTTP handler."""
+
+    def __init__(self, source=None):
+        self.source = source or default_source()
+        self.cache = ResultCache()
+        self._refreshers = {}
+        # Guards the dicts only; a partition's first load (seconds when cold)
+        # holds that partition's lock, so other partitions are not held up
+        self._lock = threading.Lock()
+        self._partition_locks = {}
+
+    def dataset(self, partition):
+        with self._lock:
+            refresher = self._refreshers.get(partition)
+            if refresher is not None:
+                return refresher.current
+            partition_lock = self._partition_locks.setdefault(partition, threading.Lock())
+        with partition_lock:
+            with self._lock:
+                refresher = self._refreshers.get(partition)
+            if refresher is None:
+                try:
+                    refresher = DatasetRefresher(self.source, partition)
+                except KeyError:
+                    with self._lock:
+                        self._partition_locks.pop(partition, None)
+                    raise KeyError(f"No partition {partition[0]}/{partition[1]}") from None
+                with self._lock:
+                    self._refreshers[partition] = refresher
+        return refresher.current
+
+    def answer(self, path, params):
+        """(ETag, build) for a query; calling build() gives (body, gzipped body or None).
+        Raises KeyError for an unknown endpoint or partition, BadRequest for bad parameters."""
+        partition = (params.get("country", [DEFAULT_PARTITION[0]])[0], params.get("indicator", [DEFAULT_PARTITION[1]])[0])
+        query = {name: sorted(values) for name, values in params.items() if name in QUERY_PARAMS}
+        if path == "/partitions":
+            partitions = dataset_store.partitions()
+            version = hashlib.sha256(partitions.to_json().encode()).hexdigest()[:12]
+            table = lambda: partitions
+        else:
+            if path not in ENDPOINTS:
+                raise KeyError(f"No endpoint {path}")
+            endpoint = ENDPOINTS[path]
+            dataset = self.dataset(partition)
+            version = dataset.version
+            table = lambda: endpoint(dataset, query)
+
+        key = (path, partition, version, tuple(sorted((name, tuple(values)) for name, values in query.items())))
+        etag = 'W/"%s"' % hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+
+        def build():
+            def body():
+                header = json.dumps({"version": version, "country": partition[0], "indicator": partition[1]})
+                rows = table().to_json(orient="records")
+                return (header[:-1] + ', "rows": ' + rows + "}").encode()
+
+            return self.cache.get(key, body)
+
+        return etag, build
+
+
+class Handler(BaseHTTPRequestHandler):
+    service = None  # set by serve()
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _respond(self, send_body):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/") or "/"
+        if path == "/":
+            return self._send_json(HTTPStatus.OK, {"endpoints": sorted(ENDPOINTS) + ["/partitions"], "cache": self.service.cache.stats()}, send_body)
+        try:
+            etag, build = self.service.answer(path, parse_qs(url.query))
+            if _matches(self.headers.get("If-None-Match"), etag):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            body, gzipped = build()
+        except BadRequest as exc:
+            return self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)}, send_body)
+        except KeyError as exc:
+            return self._send_json(HTTPStatus.NOT_FOUND, {"error": str(exc.args[0] if exc.args else exc)}, send_body)
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        # Clients may keep the body but must revalidate it (cheap, see above)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if gzipped is not None and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzipped
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _send_json(self, status, payload, send_body=True):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def _matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in {tag.strip() for tag in if_none_match.split(",")}
+
+
+def serve(host="127.0.0.1", port=8600, source=None):
+    Handler.service = QueryService(source)
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Serving on http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read-only HTTP API for the dashboard's tables.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--source", help="export file (default: the bundled workbook)")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.source)
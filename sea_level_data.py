@@ -0,0 +1,473 @@
+import functools
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import timing
+import xlsx_stream
+
+# Source files live next to the apps; resolve them from here so the loader
+# works no matter which directory `streamlit run` was started from.
+HERE = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(HERE, "sea_levels_with_years.csv")
+XLSX_PATH = os.path.join(HERE, "sea_levels_with_years (1).xlsx")
+SNAPSHOT_DIR = os.path.join(HERE, ".snapshot")
+
+# Bump whenever the snapshot layout changes so stale snapshots get rebuilt
+SNAPSHOT_VERSION = 4
+
+# Refresher threads in one process (one per store partition) may rebuild or
+# append to the same snapshot at once; each snapshot has its own lock
+_snapshot_locks = defaultdict(threading.RLock)
+_snapshot_locks_guard = threading.Lock()
+# mkstemp makes files 0600; written files get the usual umask-based mode
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+# Short satellite names for the long NOAA indicator strings
+INDICATOR_NAMES = {
+    "Change in mean sea level: Sea level: TOPEX.Poseidon": "Poseidon",
+    "Change in mean sea level: Sea level: Jason.1": "Jason.1",
+    "Change in mean sea level: Sea level: Jason.2": "Jason.2",
+    "Change in mean sea level: Sea level: Jason.3": "Jason.3",
+    "Change in mean sea level: Sea level: Sentinel-6MF": "Sentinel-6MF",
+    "Change in mean sea level: Sea level: Trend": "Trend",
+}
+
+# Columns the dashboards work with. Anything else that holds a single value
+# for the whole export (country, unit, citation...) is moved to metadata.
+CORE_COLUMNS = ["Measure", "Indicator", "Mission", "Date", "Year", "Value"]
+CATEGORY_COLUMNS = ["Measure", "Indicator", "Mission"]
+
+
+def default_source():
+    """The CSV export if it is present, otherwise the original workbook."""
+    for path in (CSV_PATH, XLSX_PATH):
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No sea level data found (looked for {CSV_PATH} and {XLSX_PATH})")
+
+
+def iter_source_chunks(path, chunk_rows=xlsx_stream.CHUNK_ROWS):
+    """Parse a CSV or xlsx export incrementally, yielding frames of at most
+    `chunk_rows` rows with strings stripped, `Date` parsed and `Mission` added."""
+    if path.endswith(".xlsx"):
+        chunks = xlsx_stream.iter_chunks(path, chunk_rows)
+    else:
+        chunks = pd.read_csv(path, chunksize=chunk_rows)
+    for chunk in chunks:
+        for col in chunk.columns:
+            if pd.api.types.is_object_dtype(chunk[col]) or pd.api.types.is_string_dtype(chunk[col]):
+                chunk[col] = chunk[col].str.strip()
+        chunk["Date"] = pd.to_datetime(chunk["Date"])
+        chunk["Mission"] = chunk["Indicator"].map(INDICATOR_NAMES).fillna(chunk["Indicator"])
+        yield chunk
+
+
+def read_source(path):
+    """Parse the raw CSV/xlsx export. Slow; use load_sea_levels() instead."""
+    return pd.concat(iter_source_chunks(path), ignore_index=True)
+
+
+# Staged type of columns whose chunks disagree beyond what Arrow can promote
+# (text in some chunks, numbers in others)
+TEXT_TYPE = pa.dictionary(pa.int32(), pa.string())
+
+
+def _chunk_table(chunk):
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+    return pa.table({
+        name: column.dictionary_encode() if pa.types.is_string(column.type) else column
+        for name, column in zip(table.column_names, table.columns)
+    })
+
+
+def _unify_types(parts):
+    """One schema for chunks parsed on their own. A column's type comes from
+    the chunks where it has values (a column blank in the first rows is
+    typed by the later ones); ints that gain gaps later become floats, and
+    a column mixing text and numbers becomes text."""
+    first_schema = parts[0][1]
+    fields = []
+    for field in first_schema:
+        seen = [schema.field(field.name) for _, schema, filled in parts if field.name in filled] or [field]
+        try:
+            unified = pa.unify_schemas([pa.schema([f]) for f in seen], promote_options="permissive").field(0)
+        except (pa.ArrowTypeError, pa.ArrowInvalid):
+            unified = pa.field(field.name, TEXT_TYPE)
+        fields.append(unified)
+    return pa.schema(fields)
+
+
+def _conform(table, schema):
+    columns = []
+    for field in schema:
+        column = table[field.name]
+        if column.type == field.type:
+            pass
+        elif field.type == TEXT_TYPE and not pa.types.is_null(column.type):
+            column = column.cast(pa.string()).dictionary_encode()
+        else:
+            column = column.cast(field.type)
+        columns.append(column)
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def stage_source(path, staging_path, chunk_rows=xlsx_stream.CHUNK_ROWS):
+    """Stream `path` into a Parquet file one row group per chunk, with the
+    string columns dictionary-encoded, so parsing never holds more than one
+    chunk of raw rows. Chunks are staged to files of their own first and
+    written out under one schema (see _unify_types), since a column's type
+    can differ between chunks. Returns the number of rows written."""
+    parts_dir = tempfile.mkdtemp(prefix=os.path.basename(staging_path) + ".", dir=os.path.dirname(staging_path) or ".")
+    rows = 0
+    try:
+        parts = []  # (file, schema, columns with any values)
+        for i, chunk in enumerate(iter_source_chunks(path, chunk_rows)):
+            table = _chunk_table(chunk)
+            part = os.path.join(parts_dir, f"{i}.parquet")
+            pq.write_table(table, part)
+            filled = {name for name, column in zip(table.column_names, table.columns) if column.null_count < len(column)}
+            parts.append((part, table.schema, filled))
+            rows += len(chunk)
+        if parts:
+            schema = _unify_types(parts)
+            with pq.ParquetWriter(staging_path, schema) as writer:
+                for part, _, _ in parts:
+                    writer.write_table(_conform(pq.read_table(part), schema))
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    return rows
+
+
+def value_decimals(values):
+    """Decimal places `values` were published with, if float32 storage can
+    reproduce them exactly after rounding; None means keep float64."""
+    values = np.asarray(values, dtype="float64")
+    known = ~np.isnan(values)
+    for decimals in range(7):
+        if np.array_equal(np.round(values[known], decimals), values[known]):
+            narrowed = values[known].astype("float32").astype("float64")
+            if np.array_equal(np.round(narrowed, decimals), values[known]):
+                return decimals
+            return None
+    return None
+
+
+def restore_values(values, decimals):
+    """float64 copy of a compact `Value` column, exactly as published."""
+    values = np.asarray(values, dtype="float64")
+    if decimals is None:
+        return values
+    return np.round(values, decimals)
+
+
+def compact_frame(data):
+    """Shrink a freshly parsed frame in place: strip strings, move constant
+    columns into `data.attrs["constants"]`, categorize the labels and narrow
+    the numeric columns. `data.attrs["value_decimals"]` records how to get
+    the exact published values back from float32 (see restore_values)."""
+    for col in data.columns:
+        if pd.api.types.is_object_dtype(data[col]) or pd.api.types.is_string_dtype(data[col]):
+            data[col] = data[col].str.strip()
+
+    constants = {}
+    for col in [c for c in data.columns if c not in CORE_COLUMNS]:
+        unique = data[col].unique()
+        if len(unique) == 1:
+            value = unique[0]
+            if pd.isna(value):
+                value = None
+            elif hasattr(value, "item"):
+                value = value.item()
+            constants[col] = value
+            del data[col]
+
+    for col in CATEGORY_COLUMNS:
+        data[col] = data[col].astype("category")
+    data["Year"] = data["Year"].astype("int16")
+    if "Object ID" in data:
+        data["Object ID"] = data["Object ID"].astype("int32")
+    decimals = value_decimals(data["Value"])
+    if decimals is not None:
+        data["Value"] = data["Value"].astype("float32")
+
+    data.attrs["constants"] = constants
+    data.attrs["value_decimals"] = decimals
+    return data
+
+
+def _runs(codes):
+    """[start, stop) of every run of equal values in a sorted code array."""
+    boundaries = np.flatnonzero(np.diff(codes)) + 1
+    return np.r_[0, boundaries], np.r_[boundaries, len(codes)]
+
+
+class SortedRows:
+    """Rows sorted by (Measure, Mission, Date) plus the offsets of every
+    region and every (region, mission) run, so selecting either is a
+    zero-copy `iloc` slice instead of a full-length boolean mask. Mission is
+    the short name of Indicator, so this is also the (Measure, Indicator)
+    order without carrying the long strings along."""
+
+    SORT_KEYS = ["Measure", "Mission", "Date"]
+
+    def __init__(self, frame):
+        self.rows = frame.sort_values(self.SORT_KEYS, kind="stable").reset_index(drop=True)
+        region = self.rows["Measure"].cat.codes.to_numpy().astype("int64")
+        mission = self.rows["Mission"].cat.codes.to_numpy().astype("int64")
+
+        starts, stops = _runs(region)
+        self.region_offsets = {
+            self.rows["Measure"].iat[a]: (a, b) for a, b in zip(starts.tolist(), stops.tolist())
+        }
+        starts, stops = _runs(region * (mission.max() + 1) + mission)
+        self.pair_offsets = {
+            (self.rows["Measure"].iat[a], self.rows["Mission"].iat[a]): (a, b)
+            for a, b in zip(starts.tolist(), stops.tolist())
+        }
+
+    def region(self, region):
+        start, stop = self.region_offsets.get(region, (0, 0))
+        return self.rows.iloc[start:stop]
+
+    def pair(self, region, mission):
+        start, stop = self.pair_offsets.get((region, mission), (0, 0))
+        return self.rows.iloc[start:stop]
+
+    def runs(self, region="All", mission="All"):
+        """[start, stop) of every (region, mission) run matching the filter;
+        each run is one date-sorted series."""
+        return [
+            offsets for (run_region, run_mission), offsets in self.pair_offsets.items()
+            if region in ("All", run_region) and mission in ("All", run_mission)
+        ]
+
+    def mission(self, mission):
+        """All rows of one mission. These are spread over every region, so
+        this gathers (and copies) one run per region."""
+        runs = [np.arange(a, b) for a, b in self.runs(mission=mission)]
+        return self.rows.take(np.concatenate(runs) if runs else np.array([], dtype="int64"))
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_paths(source):
+    name = os.path.basename(source)
+    return (
+        os.path.join(SNAPSHOT_DIR, name + ".parquet"),
+        os.path.join(SNAPSHOT_DIR, name + ".json"),
+    )
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _temp_path(path, suffix=".tmp"):
+    """A new empty file next to `path`, unique across threads and processes."""
+    fd, tmp = tempfile.mkstemp(suffix=suffix, prefix=os.path.basename(path) + ".", dir=os.path.dirname(path) or ".")
+    os.close(fd)
+    os.chmod(tmp, 0o666 & ~_UMASK)
+    return tmp
+
+
+def _write_atomic(path, write):
+    tmp = _temp_path(path)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _locked_snapshot(func):
+    """Run `func(source, ...)` holding the lock of `source`'s snapshot."""
+
+    @functools.wraps(func)
+    def locked(source=None, *args, **kwargs):
+        source = source or default_source()
+        with _snapshot_locks_guard:
+            lock = _snapshot_locks[os.path.abspath(source)]
+        with lock:
+            return func(source, *args, **kwargs)
+
+    return locked
+
+
+def snapshot_is_fresh(source, meta):
+    """Cheap mtime/size check first, falling back to the content hash
+    (a fresh git checkout touches mtimes without changing the data)."""
+    if meta is None or meta.get("version") != SNAPSHOT_VERSION:
+        return False
+    stat = os.stat(source)
+    if meta["size"] != stat.st_size:
+        return False
+    if meta["mtime_ns"] == stat.st_mtime_ns:
+        return True
+    return meta["sha256"] == file_sha256(source)
+
+
+@_locked_snapshot
+def build_snapshot(source=None):
+    """Parse `source` and write its typed columnar snapshot. Returns the frame."""
+    source = source or default_source()
+    parquet_path, meta_path = snapshot_paths(source)
+    stat = os.stat(source)
+    sha256 = file_sha256(source)
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    staging_path = _temp_path(parquet_path, ".staging")
+    try:
+        with timing.stage("parse_source") as s:
+            s.rows = stage_source(source, staging_path)
+        data = compact_frame(pd.read_parquet(staging_path))
+    finally:
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+    data.attrs["source_sha256"] = sha256
+
+    _write_atomic(parquet_path, lambda tmp: data.to_parquet(tmp, index=False))
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "source": os.path.basename(source),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256,
+        "rows": len(data),
+    }
+    _write_atomic(meta_path, lambda tmp: _dump_json(meta, tmp))
+    return data
+
+
+def _dump_json(obj, path):
+    with open(path, "w") as f:
+        json.dump(obj, f, indent=2)
+
+
+@_locked_snapshot
+def load_sea_levels(source=None):
+    """Load the compact sea level table (see compact_frame), parsing the
+    source only when its snapshot is missing or stale. `Date` comes back
+    parsed and `Mission` holds the short satellite name for each `Indicator`."""
+    source = source or default_source()
+    parquet_path, meta_path = snapshot_paths(source)
+    meta = _read_meta(meta_path)
+    if os.path.exists(parquet_path) and snapshot_is_fresh(source, meta):
+        if meta["mtime_ns"] != os.stat(source).st_mtime_ns:
+            # Same content under a new mtime; remember it to skip hashing next time
+            meta["mtime_ns"] = os.stat(source).st_mtime_ns
+            _write_atomic(meta_path, lambda tmp: _dump_json(meta, tmp))
+        with timing.stage("load_snapshot") as s:
+            data = pd.read_parquet(parquet_path)
+            s.rows = len(data)
+        return data
+    return build_snapshot(source)
+
+
+@_locked_snapshot
+def append_rows(source, release):
+    """Add the rows of `release` (a CSV/xlsx export of new cycles, shaped
+    like `source`) that the snapshot of `source` does not have yet, keyed on
+    (Measure, Indicator, Date). Only the release is parsed. The snapshot's
+    `source_sha256` becomes a hash of the source and its releases so cached
+    tables and charts see a new version.
+
+    Returns (the full compact frame, the compact rows that were added).
+    """
+    source = source or default_source()
+    data = load_sea_levels(source)
+    parquet_path, meta_path = snapshot_paths(source)
+    meta = _read_meta(meta_path)
+    release_sha256 = file_sha256(release)
+    if any(entry["sha256"] == release_sha256 for entry in meta.get("releases", [])):
+        return data, data.iloc[:0]
+
+    new = read_source(release)
+    constants = data.attrs["constants"]
+    for col in [c for c in new.columns if c in constants]:
+        values = new[col].dropna().unique()
+        if len(values) > 1 or (len(values) == 1 and values[0] != constants[col]):
+            raise ValueError(f"{release} has {col} values other than {constants[col]!r}")
+        del new[col]
+    missing = set(data.columns) - set(new.columns)
+    if missing:
+        raise ValueError(f"{release} is missing columns {sorted(missing)}")
+
+    key = ["Measure", "Indicator", "Date"]
+    seen = pd.MultiIndex.from_frame(data[key].astype({"Measure": str, "Indicator": str}))
+    new = new.loc[~pd.MultiIndex.from_frame(new[key]).isin(seen), list(data.columns)]
+    added = data.iloc[:0]
+    if not new.empty:
+        exact = data.assign(Value=restore_values(data["Value"], data.attrs.get("value_decimals")))
+        combined = pd.concat([exact, new], ignore_index=True)
+        for col in CATEGORY_COLUMNS:
+            combined[col] = combined[col].astype(str)
+        sha256 = hashlib.sha256(f"{data.attrs['source_sha256']} {release_sha256}".encode()).hexdigest()
+        data = compact_frame(combined)
+        data.attrs["constants"] = constants
+        data.attrs["source_sha256"] = sha256
+        added = data.iloc[len(data) - len(new):]
+        _write_atomic(parquet_path, lambda tmp: data.to_parquet(tmp, index=False))
+
+    # Recorded even when every row was already there, so it is not re-read
+    meta.setdefault("releases", []).append(
+        {"source": os.path.basename(release), "sha256": release_sha256, "rows": len(added)}
+    )
+    meta["rows"] = len(data)
+    meta["data_sha256"] = data.attrs["source_sha256"]
+    _write_atomic(meta_path, lambda tmp: _dump_json(meta, tmp))
+    return data, added
+
+
+@_locked_snapshot
+def ensure_snapshot(source):
+    """Build the snapshot of `source` if it is missing or stale; returns its
+    metadata (rows, sha256...) rather than the frame so it is cheap to send
+    back from a worker process."""
+    parquet_path, meta_path = snapshot_paths(source)
+    if not (os.path.exists(parquet_path) and snapshot_is_fresh(source, _read_meta(meta_path))):
+        build_snapshot(source)
+    return _read_meta(meta_path)
+
+
+def ensure_snapshots(sources, processes=None):
+    """ensure_snapshot() for several exports at once, one worker process each."""
+    sources = list(sources)
+    if len(sources) <= 1:
+        # Not worth starting a pool for
+        return [ensure_snapshot(source) for source in sources]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(ensure_snapshot, sources))
+
+
+if __name__ == "__main__":
+    # python sea_level_data.py [export.xlsx|export.csv ...]
+    start = time.perf_counter()
+    for meta in ensure_snapshots(sys.argv[1:] or [default_source()]):
+        print(f"{meta['source']}: {meta['rows']} rows ({meta['sha256'][:12]})")
+    print(f"done in {time.perf_counter() - start:.1f}s")
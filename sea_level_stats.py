@@ -0,0 +1,291 @@
+import numpy as np
+import pandas as pd
+
+CUBE_KEYS = ["Year", "Measure", "Mission"]
+MOMENTS = ["count", "sum", "sumsq"]
+
+
+class AggregateCube:
+    """count, sum and sum of squares of `Value` per (Year, Measure, Mission).
+
+    Every mean/std table the dashboards show is a roll-up of these cells, so
+    answering one touches a few thousand cells instead of every raw row.
+    Mission is a relabelling of `Indicator`, so these are also the
+    (Year, Measure, Indicator) cells.
+    """
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    @classmethod
+    def from_frame(cls, frame):
+        grouped = frame.assign(sumsq=np.square(frame["Value"])).groupby(CUBE_KEYS, observed=True)
+        cells = pd.DataFrame({
+            "count": grouped["Value"].count(),
+            "sum": grouped["Value"].sum(),
+            "sumsq": grouped["sumsq"].sum(),
+        }).reset_index()
+        return cls(cells)
+
+    def merge(self, other):
+        """The cube of both cubes' rows together. Moments add, so appending
+        rows only needs the cube of the new rows."""
+        cells = pd.concat([self.cells, other.cells], ignore_index=True)
+        for col in CUBE_KEYS[1:]:
+            if not isinstance(cells[col].dtype, pd.CategoricalDtype):
+                cells[col] = cells[col].astype("category")
+        cells = cells.groupby(CUBE_KEYS, as_index=False, observed=True, sort=True)[MOMENTS].sum()
+        return AggregateCube(cells)
+
+    def select(self, max_year=None, region="All", mission="All"):
+        """The sub-cube for a year cut-off and a region/mission filter."""
+        cells = self.cells
+        if max_year is not None:
+            cells = cells[cells["Year"] <= max_year]
+        if region != "All":
+            cells = cells[cells["Measure"] == region]
+        if mission != "All":
+            cells = cells[cells["Mission"] == mission]
+        return AggregateCube(cells)
+
+    def rollup(self, by):
+        return self.cells.groupby(by, as_index=False, observed=True)[MOMENTS].sum()
+
+    def mean(self, by):
+        """`frame.groupby(by, as_index=False)["Value"].mean()`, equal to it
+        within float64 rounding (the sums are taken in another order)."""
+        moments = self.rollup(by)
+        return moments[by].assign(Value=moments["sum"] / moments["count"])
+
+    def std(self, by):
+        """`frame.groupby(by, as_index=False)["Value"].std()`, equal to it
+        within float64 rounding (the sums are taken in another order)."""
+        moments = self.rollup(by)
+        return moments[by].assign(Value=moment_std(moments["count"], moments["sum"], moments["sumsq"]))
+
+
+def moment_std(count, total, sumsq):
+    """Sample standard deviation (ddof=1) from count/sum/sum of squares;
+    NaN where there are fewer than two observations, like pandas."""
+    count = np.asarray(count, dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (np.asarray(sumsq) - np.square(total) / count) / (count - 1)
+    variance = np.where(count > 1, np.maximum(variance, 0.0), np.nan)
+    return np.sqrt(variance)
+
+
+class RunningStats:
+    """Welford-style count, mean and M2 (sum of squared deviations from the
+    mean) of `Value` per group, indexed by the group key.
+
+    Batches merge with Chan et al.'s pairwise update, so appended rows fold
+    into existing statistics without revisiting old rows and without the
+    cancellation a sum-of-squares variance suffers from.
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    @classmethod
+    def from_frame(cls, frame, by):
+        grouped = frame.groupby(by, observed=True)["Value"]
+        count = grouped.count()
+        mean = grouped.mean()
+        # M2 is (n - 1) * sample variance; a single row has no spread
+        m2 = (grouped.var(ddof=1) * (count - 1)).fillna(0.0)
+        table = pd.DataFrame({"count": count, "mean": mean, "m2": m2})
+        table.index = table.index.astype(object)
+        return cls(table)
+
+    def merge(self, other):
+        a, b = self.table.align(other.table, join="outer", fill_value=0)
+        a, b = a.astype("float64"), b.astype("float64")
+        count = a["count"] + b["count"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = b["mean"] - a["mean"]
+            mean = np.where(count > 0, a["mean"] + delta * b["count"] / count, np.nan)
+            m2 = a["m2"] + b["m2"] + np.where(count > 0, delta ** 2 * a["count"] * b["count"] / count, 0.0)
+        # A group only one side has keeps that side's mean exactly
+        mean = np.where(a["count"] == 0, b["mean"], np.where(b["count"] == 0, a["mean"], mean))
+        table = pd.DataFrame({"count": count.astype("int64"), "mean": mean, "m2": m2}, index=count.index)
+        return RunningStats(table)
+
+    def update(self, frame, by):
+        """These statistics with the rows of `frame` added."""
+        return self.merge(RunningStats.from_frame(frame, by))
+
+    def std(self):
+        """Sample standard deviation (ddof=1) per group, NaN below two rows."""
+        count = self.table["count"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.sqrt(self.table["m2"] / (count - 1)).where(count > 1)
+
+
+class YearRangeIndex:
+    """Per-region prefix sums of count/sum/sum of squares over the years.
+
+    Column j of each (region, year) array holds the totals for every year
+    before `years[j]`, so the mean/std of any [start, end] window is two
+    array lookups per region rather than a rescan of the rows.
+    """
+
+    def __init__(self, cube):
+        moments = cube.rollup(["Measure", "Year"])
+        self.regions = np.array(sorted(moments["Measure"].unique()), dtype=object)
+        self.years = np.arange(moments["Year"].min(), moments["Year"].max() + 1)
+        rows = np.searchsorted(self.regions, moments["Measure"].astype(str).to_numpy())
+        cols = np.searchsorted(self.years, moments["Year"].to_numpy()) + 1
+        self.prefix = {}
+        for moment in MOMENTS:
+            totals = np.zeros((len(self.regions), len(self.years) + 1))
+            totals[rows, cols] = moments[moment].to_numpy()
+            self.prefix[moment] = np.cumsum(totals, axis=1)
+
+    def _bounds(self, start, end):
+        return (
+            np.searchsorted(self.years, start, side="left"),
+            np.searchsorted(self.years, end, side="right"),
+        )
+
+    def region_stats(self, start, end):
+        """Count, mean and volatility (std) of every region over [start, end]."""
+        lo, hi = self._bounds(start, end)
+        count, total, sumsq = (self.prefix[m][:, hi] - self.prefix[m][:, lo] for m in MOMENTS)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = total / count
+        return pd.DataFrame({
+            "Measure": self.regions,
+            "count": count,
+            "Mean": mean,
+            "Volatility": moment_std(count, total, sumsq),
+        })
+
+    def top_volatile(self, start, end, n=10):
+        stats = self.region_stats(start, end)
+        stats = stats[stats["count"] > 0].sort_values("Volatility", ascending=False).head(n)
+        return stats[["Measure", "Volatility"]].reset_index(drop=True)
+
+    def year_means(self, start, end, regions=None):
+        """Mean `Value` per year in [start, end] over all (or the given) regions."""
+        lo, hi = self._bounds(start, end)
+        rows = slice(None) if regions is None else np.isin(self.regions, regions)
+        count, total = (np.diff(self.prefix[m][rows, lo:hi + 1], axis=1).sum(axis=0) for m in ("count", "sum"))
+        years = self.years[lo:hi]
+        present = count > 0
+        return pd.DataFrame({"Year": years[present], "Value": total[present] / count[present]})
+
+
+# Trend fits measure time in years from here, which keeps the powers of t in
+# the normal equations small enough to stay well conditioned
+TREND_ORIGIN = 2000
+# Power sums of t (up to t^4) and of t^k * Value (up to k = 2) that the
+# linear and quadratic least-squares fits are built from
+TIME_POWERS = 5
+VALUE_POWERS = 3
+
+
+def decimal_years(dates):
+    """Dates as fractional years, e.g. 2020-07-02 -> ~2020.5."""
+    dates = pd.DatetimeIndex(dates)
+    days = np.where(dates.is_leap_year, 366.0, 365.0)
+    return dates.year + (dates.dayofyear - 1) / days
+
+
+def solve_polyfits(time_sums, value_sums, degree):
+    """Least-squares polynomial coefficients (constant term first) for a
+    stack of series given their power sums: `time_sums[..., k]` is the sum
+    of t^k and `value_sums[..., k]` the sum of t^k * y. All the normal
+    equations are solved in one batched call; series with too few points
+    for `degree` come back as NaN."""
+    terms = degree + 1
+    powers = np.arange(terms)
+    normal = time_sums[..., powers[:, None] + powers[None, :]]
+    rhs = value_sums[..., :terms]
+    coefficients = np.full(rhs.shape, np.nan)
+    count = time_sums[..., 0]
+    # Spread of t within the series, without which there is no slope
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spread = time_sums[..., 2] - np.square(time_sums[..., 1]) / count
+    fit = (count > degree) & (spread > 1e-9)
+    if fit.any():
+        try:
+            coefficients[fit] = np.linalg.solve(normal[fit], rhs[fit][..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            # Only when some series has fewer distinct times than terms
+            coefficients[fit] = (np.linalg.pinv(normal[fit]) @ rhs[fit][..., None])[..., 0]
+    return coefficients
+
+
+class TrendIndex:
+    """Per-series, per-year prefix sums of the least-squares moments, so the
+    linear or quadratic trend of every series over any year window (or every
+    rolling window) is one batched solve instead of a fit per group.
+
+    A series is one combination of `keys`, e.g. (Measure, Mission) for each
+    satellite's record of each region, or just Measure to pool the missions.
+    Rates are mm per year; acceleration is twice the quadratic term, in mm
+    per year squared.
+    """
+
+    def __init__(self, frame, keys=("Measure", "Mission")):
+        self.keys = list(keys)
+        groups = frame.groupby(self.keys, observed=True, sort=True)
+        self.series = groups.size().index.to_frame(index=False)
+        for col in self.keys:
+            self.series[col] = self.series[col].astype(str)
+        series = groups.ngroup().to_numpy()
+        self.years = np.arange(frame["Year"].min(), frame["Year"].max() + 1)
+        cols = np.searchsorted(self.years, frame["Year"].to_numpy()) + 1
+        cell = series * (len(self.years) + 1) + cols
+        shape = (len(self.series), len(self.years) + 1)
+
+        t = decimal_years(frame["Date"]).to_numpy() - TREND_ORIGIN
+        y = frame["Value"].to_numpy(dtype="float64")
+        powers = t[:, None] ** np.arange(TIME_POWERS)
+        sums = [np.bincount(cell, powers[:, k], minlength=shape[0] * shape[1]) for k in range(TIME_POWERS)]
+        sums += [np.bincount(cell, powers[:, k] * y, minlength=shape[0] * shape[1]) for k in range(VALUE_POWERS)]
+        # (series, year + 1, moment), cumulative over the years
+        self.prefix = np.cumsum(np.stack(sums, axis=-1).reshape(shape + (len(sums),)), axis=1)
+
+    def _fit(self, lo, hi, degree):
+        sums = self.prefix[:, hi] - self.prefix[:, lo]
+        return sums[..., 0], solve_polyfits(sums[..., :TIME_POWERS], sums[..., TIME_POWERS:], degree)
+
+    def _bounds(self, start, end):
+        return (
+            np.searchsorted(self.years, start, side="left"),
+            np.searchsorted(self.years, end, side="right"),
+        )
+
+    def fit(self, start=None, end=None):
+        """Linear rate and quadratic acceleration of every series over the
+        years [start, end] (default: all of them)."""
+        lo, hi = self._bounds(self.years[0] if start is None else start, self.years[-1] if end is None else end)
+        count, linear = self._fit(lo, hi, 1)
+        _, quadratic = self._fit(lo, hi, 2)
+        return self.series.assign(
+            count=count.astype("int64"),
+            Rate=linear[:, 1],
+            Acceleration=2 * quadratic[:, 2],
+        )
+
+    def rolling(self, window=10):
+        """Linear rate and quadratic acceleration of every series over every
+        `window`-year span, one row per series and span (labelled by its
+        last year). Spans that run past the first year are left out."""
+        ends = np.arange(window - 1, len(self.years))
+        lo, hi = ends - window + 1, ends + 1
+        count, linear = self._fit(lo, hi, 1)
+        _, quadratic = self._fit(lo, hi, 2)
+        table = self.series.loc[np.repeat(self.series.index, len(ends))].reset_index(drop=True)
+        return table.assign(
+            Year=np.tile(self.years[ends], len(self.series)),
+            count=count.ravel().astype("int64"),
+            Rate=linear[..., 1].ravel(),
+            Acceleration=2 * quadratic[..., 2].ravel(),
+        )
+
+    def fastest_rising(self, start, end, n=10):
+        stats = self.fit(start, end)
+        stats = stats[stats["count"] > 0].dropna(subset=["Rate"])
+        return stats.sort_values("Rate", ascending=False).head(n).reset_index(drop=True)
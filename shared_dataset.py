@@ -0,0 +1,430 @@
+import functools
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import streamlit as st
+
+from downsample import CLIENT_REGION_POINT_BUDGET, LINE_POINT_BUDGET, downsample_runs
+import dataset_store
+import timing
+import warm_start
+from mission_merge import load_merged
+from sea_level_data import HERE, SortedRows, append_rows, default_source, load_sea_levels, restore_values
+from sea_level_stats import AggregateCube, RunningStats, TrendIndex, YearRangeIndex
+
+# The interactive views stop at the last complete year
+MAX_YEAR = 2024
+TOP_N_VOLATILE = 10
+
+# The only columns the charts encode; everything else stays server-side
+CHART_COLUMNS = ["Year", "Measure", "Mission", "Date", "Value"]
+# What SeaLevelDataset reads from the partitioned store (see dataset_store):
+# the chart columns, Mission included because the cube and the mission
+# filters are keyed on it
+DATASET_COLUMNS = ["Measure", "Mission", "Date", "Year", "Value"]
+
+# Release files (new cycles, shaped like the main export) dropped here are
+# appended by the refresher; see DatasetRefresher
+RELEASE_DIR = os.path.join(HERE, "releases")
+RELEASE_SUFFIXES = (".csv", ".xlsx")
+# Seconds between the refresher's checks of the source and RELEASE_DIR
+REFRESH_INTERVAL = 5.0
+
+# What a (Year, Measure) heatmap cell can show: the mean of its rows, their
+# maximum, or the most recent measurement
+HEATMAP_STATS = ["mean", "max", "last"]
+
+
+def volatility_table(region_stats):
+    table = region_stats.table.sort_index()
+    return pd.DataFrame({"Measure": table.index, "Volatility": region_stats.std()[table.index].to_numpy()})
+
+
+def year_average_table(cube):
+    year_average = cube.mean(["Year"])
+    year_average["Change"] = year_average["Value"].diff()
+    return year_average
+
+
+def dataset_aggregates(exact):
+    """(cube, per-region stats, per-region stats up to MAX_YEAR) of a frame
+    with exact float64 values: everything SeaLevelDataset derives its
+    statistics tables from, and all of it mergeable with new rows."""
+    return (
+        AggregateCube.from_frame(exact),
+        RunningStats.from_frame(exact, "Measure"),
+        RunningStats.from_frame(exact[exact["Year"] <= MAX_YEAR], "Measure"),
+    )
+
+
+class SeaLevelDataset:
+    """Read-only sea level data plus every table the dashboards derive from it.
+
+    One instance is shared by all sessions in the process (see get_dataset()),
+    so nothing here may be mutated after construction. `data` is the compact
+    table from load_sea_levels(); `data2` and the derived tables use the exact
+    float64 values. The statistics tables are roll-ups of `cube` and the
+    per-region `region_stats`, so no raw-row groupby runs after construction
+    and appended() can update them from new rows alone. Per-session
+    filtering goes through view(), which slices the region-sorted
+    `sorted_rows` without copying.
+    """
+
+    def __init__(self, data, aggregates=None):
+        self.data = data
+        self.metadata = dict(data.attrs)
+        # Identifies the data behind every cached table and chart spec
+        self.version = self.metadata.get("source_sha256", "")[:12]
+        exact = data.assign(Value=restore_values(data["Value"], self.metadata.get("value_decimals")))
+        self.data2 = exact[exact["Year"] <= MAX_YEAR]
+        self.sorted_rows = SortedRows(self.data2[CHART_COLUMNS])
+        self.regions = ["All"] + sorted(data["Measure"].unique())
+        self.missions = ["All"] + sorted(data["Mission"].unique())
+
+        if aggregates is None:
+            aggregates = dataset_aggregates(exact)
+        self.cube, self.region_stats_all, self.region_stats = aggregates
+        self.cube2 = self.cube.select(max_year=MAX_YEAR)
+        self.year_index = YearRangeIndex(self.cube2)
+        self.first_year, self.last_year = int(self.year_index.years[0]), int(self.year_index.years[-1])
+        self.volatility_by_region = volatility_table(self.region_stats)
+        self.volatility_all_years = volatility_table(self.region_stats_all)
+        self.top_volatile = self.volatility_by_region.sort_values("Volatility", ascending=False).head(TOP_N_VOLATILE)
+        self.top_10_measures = self.top_volatile["Measure"].tolist()
+        self.average_per_year = self.cube2.mean(["Year"])
+        self.average_per_measure = self.cube2.mean(["Year", "Measure"])
+        self.average_per_measure_top10 = self.average_per_measure[
+            self.average_per_measure["Measure"].isin(self.top_10_measures)
+        ]
+        # Rate of rise and acceleration per region (missions pooled), for any
+        # year window; per satellite record see `trends`
+        self.region_trends = TrendIndex(self.data2, ["Measure"])
+
+        # One offset-corrected series per region instead of every mission's
+        # overlapping record (see mission_merge), for charts that pass
+        # merged=True. Cached in the snapshot directory per data version and rows.
+        merged = load_merged(self.data2, self.version)
+        self.merged_rows = SortedRows(merged[CHART_COLUMNS])
+        self.merged_cube = AggregateCube.from_frame(merged)
+        self.merged_average_per_year = self.merged_cube.mean(["Year"])
+
+        # Date as int64 ns and Value of the raw and merged rows, for LTTB
+        self._line_xy = {
+            merged: (
+                rows.rows["Date"].to_numpy().astype("datetime64[ns]").view("int64"),
+                rows.rows["Value"].to_numpy(),
+            )
+            for merged, rows in ((False, self.sorted_rows), (True, self.merged_rows))
+        }
+        # Serialized chart specs shipped with the data (see warm_start), keyed
+        # on (chart id, params) as show_chart() looks them up
+        self.chart_specs = {}
+        self._init_memos()
+
+    # Per-process state that is rebuilt rather than pickled (see warm_start)
+    _MEMOS = ("_line_rows", "_mission_views", "_year_averages", "_heatmap_cells", "_trends", "_lock")
+
+    def _init_memos(self):
+        self._line_rows = functools.lru_cache(maxsize=256)(self._downsampled_rows)
+        self._mission_views = {}
+        self._year_averages = {}
+        self._heatmap_cells = {}
+        self._trends = None
+        # Re-entrant: heatmap_cells() calls view() while holding it
+        self._lock = threading.RLock()
+
+    @property
+    def trends(self):
+        """Rate of rise and acceleration per satellite record (Measure,
+        Mission). No chart draws it, so it is only built on first use."""
+        with self._lock:
+            if self._trends is None:
+                self._trends = TrendIndex(self.data2, ["Measure", "Mission"])
+            return self._trends
+
+    def __getstate__(self):
+        return {key: value for key, value in self.__dict__.items() if key not in self._MEMOS}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_memos()
+
+    def appended(self, data, new_rows):
+        """The dataset for `data`, which is this dataset's rows plus
+        `new_rows` (see sea_level_data.append_rows). The cube and per-region
+        statistics are merged with those of the new rows instead of being
+        recomputed; only the row-level sort is redone."""
+        new = new_rows.assign(Value=restore_values(new_rows["Value"], data.attrs.get("value_decimals")))
+        aggregates = (
+            self.cube.merge(AggregateCube.from_frame(new)),
+            self.region_stats_all.update(new, "Measure"),
+            self.region_stats.update(new[new["Year"] <= MAX_YEAR], "Measure"),
+        )
+        return SeaLevelDataset(data, aggregates)
+
+    def view(self, region="All", mission="All", merged=False):
+        """Chart rows of `data2` for one region/mission, sorted by
+        (Measure, Mission, Date). Zero-copy unless only a mission is picked.
+        With `merged`, one continuous series per region (`mission` must be
+        "All"), sorted by (Measure, Date)."""
+        with timing.stage("filter") as s:
+            rows = self._view(region, mission, merged)
+            s.rows = len(rows)
+        return rows
+
+    def _view(self, region, mission, merged):
+        if merged:
+            if mission != "All":
+                raise ValueError("the merged series combines every mission")
+            return self.merged_rows.region(region) if region != "All" else self.merged_rows.rows
+        if region != "All" and mission != "All":
+            return self.sorted_rows.pair(region, mission)
+        if region != "All":
+            return self.sorted_rows.region(region)
+        if mission == "All":
+            return self.sorted_rows.rows
+        with self._lock:
+            if mission not in self._mission_views:
+                self._mission_views[mission] = self.sorted_rows.mission(mission)
+            return self._mission_views[mission]
+
+    def line_rows(self, region="All", mission="All", start=None, end=None, budget=LINE_POINT_BUDGET, merged=False):
+        """view() downsampled with LTTB to about `budget` points, per series.
+        `start`/`end` (timestamps) restrict it to a zoom window first, so a
+        zoomed-in chart gets the same budget over a shorter span."""
+        if merged and mission != "All":
+            raise ValueError("the merged series combines every mission")
+        start = None if start is None else np.datetime64(start, "ns").view("int64")
+        end = None if end is None else np.datetime64(end, "ns").view("int64")
+        with timing.stage("downsample") as s:
+            rows = self._line_rows(region, mission, start, end, budget, merged)
+            s.rows = len(rows)
+        return rows
+
+    def client_line_rows(self, budget=CLIENT_REGION_POINT_BUDGET, merged=False):
+        """Every region's line downsampled separately to `budget` points, so
+        a region picked in the browser still gets a detailed line."""
+        return pd.concat([self.line_rows(region, budget=budget, merged=merged) for region in self.regions[1:]])
+
+    def _downsampled_rows(self, region, mission, start, end, budget, merged):
+        sorted_rows = self.merged_rows if merged else self.sorted_rows
+        x, y = self._line_xy[merged]
+        runs = []
+        for a, b in sorted_rows.runs(region, mission):
+            if start is not None:
+                a += int(np.searchsorted(x[a:b], start, side="left"))
+            if end is not None:
+                b = a + int(np.searchsorted(x[a:b], end, side="right"))
+            if b > a:
+                runs.append((a, b))
+        keep = downsample_runs(x, y, runs, budget)
+        return sorted_rows.rows.take(keep)
+
+    def heatmap_cells(self, region="All", mission="All", stat="mean", merged=False):
+        """One row per (Year, Measure) for the heatmap, instead of every raw
+        row stacked into the same cell. Memoized per filter and statistic."""
+        if stat not in HEATMAP_STATS:
+            raise ValueError(f"stat must be one of {HEATMAP_STATS}, not {stat!r}")
+        key = (region, mission, stat, merged)
+        with self._lock, timing.stage("aggregate") as s:
+            if key not in self._heatmap_cells:
+                if stat == "mean":
+                    cube = self.merged_cube if merged else self.cube2
+                    cells = cube.select(region=region, mission=mission).mean(["Year", "Measure"])
+                else:
+                    rows = self.view(region, mission, merged).sort_values("Date", kind="stable")
+                    cells = rows.groupby(["Year", "Measure"], as_index=False, observed=True)["Value"].agg(stat)
+                self._heatmap_cells[key] = cells
+            s.rows = len(self._heatmap_cells[key])
+            return self._heatmap_cells[key]
+
+    def year_average(self, region="All", mission="All"):
+        key = (region, mission)
+        with self._lock, timing.stage("aggregate"):
+            if key not in self._year_averages:
+                self._year_averages[key] = year_average_table(self.cube2.select(region=region, mission=mission))
+            return self._year_averages[key]
+
+
+def load_dataset(source=None, partition=None, bundle=True):
+    """A new SeaLevelDataset for `source`, or for one (country, indicator)
+    `partition` of the dataset store, outside any Streamlit cache (for
+    scripts and worker processes; the apps use get_dataset()). Comes from
+    the warm-start bundle when one was built for the same data, unless
+    `bundle` is False."""
+    source = source or default_source()
+    if bundle:
+        dataset = warm_start.load_bundle(source, partition)
+        if dataset is not None:
+            return dataset
+    if partition is None:
+        return SeaLevelDataset(load_sea_levels(source))
+    dataset_store.ensure_store([source])
+    return SeaLevelDataset(dataset_store.query(*partition, columns=DATASET_COLUMNS))
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class DatasetRefresher:
+    """Holds the current SeaLevelDataset for `source` (or for one
+    (country, indicator) `partition` of the dataset store) and replaces it
+    from a daemon thread when the data changes, so no session pays for a
+    reload inside its rerun.
+
+    The thread polls every `interval` seconds. A change to the source file
+    rebuilds the snapshot and the dataset; a new file in `release_dir` is
+    appended with append_rows() and, for a file-backed dataset, folded into
+    the aggregates with SeaLevelDataset.appended(). A file is only picked up
+    once its size/mtime held still for one interval, so half-copied files
+    are left alone.
+
+    `current` is swapped by a single assignment and datasets are never
+    mutated, so a rerun that read it once keeps a consistent snapshot even
+    if a refresh lands halfway through. A failed refresh keeps the old
+    dataset and is retried on the next poll; status() reports it.
+    """
+
+    def __init__(self, source, partition=None, release_dir=RELEASE_DIR, interval=REFRESH_INTERVAL):
+        self.source = source
+        self.partition = partition
+        self.release_dir = release_dir
+        self.interval = interval
+        self.refreshes = 0
+        self.error = None
+        self._seen = self._signatures()
+        self._pending = None
+        self._stop = threading.Event()
+
+        started = time.perf_counter()
+        self.current = self._apply_releases(self._load(), sorted(self._releases()))
+        self.refresh_seconds = time.perf_counter() - started
+        self.refreshed_at = time.time()
+
+        self._thread = threading.Thread(target=self._run, name="sea-level-refresh", daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        return load_dataset(self.source, self.partition)
+
+    def _releases(self):
+        try:
+            names = os.listdir(self.release_dir)
+        except OSError:
+            return {}
+        paths = [os.path.join(self.release_dir, name) for name in names if name.endswith(RELEASE_SUFFIXES)]
+        return {path: _file_signature(path) for path in paths}
+
+    def _signatures(self):
+        return {self.source: _file_signature(self.source), **self._releases()}
+
+    def _apply_releases(self, dataset, releases):
+        """`dataset` brought up to date with `releases`. Another refresher
+        on the same source (or another process sharing the snapshot) may
+        have appended a release first, in which case append_rows() adds
+        nothing here but the data still moved on; the version says so."""
+        for release in releases:
+            data, added = append_rows(self.source, release)
+            if self.partition is not None or data.attrs["source_sha256"] == dataset.metadata.get("source_sha256"):
+                continue
+            if len(added) and len(data) == len(dataset.data) + len(added):
+                dataset = dataset.appended(data, added)
+            else:
+                dataset = SeaLevelDataset(data)
+        if self.partition is not None and releases:
+            # The store partition follows the snapshot; reload it once if it moved
+            if warm_start.data_sha256(self.source, self.partition) != dataset.metadata.get("source_sha256"):
+                dataset = self._load()
+        return dataset
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            signatures = self._signatures()
+            if signatures == self._seen:
+                self._pending = None
+                continue
+            if signatures != self._pending:
+                # Changed since the last poll; wait for it to settle
+                self._pending = signatures
+                continue
+            self.refresh(signatures)
+
+    def refresh(self, signatures=None):
+        """Pick up whatever changed since the last refresh, now."""
+        signatures = signatures or self._signatures()
+        started = time.perf_counter()
+        try:
+            if signatures.get(self.source) != self._seen.get(self.source):
+                # A new export may already hold the releases; append_rows skips those rows
+                dataset = self._apply_releases(self._load(), sorted(self._releases()))
+            else:
+                new = sorted(path for path, sig in signatures.items() if self._seen.get(path) != sig)
+                dataset = self._apply_releases(self.current, new)
+        except Exception as exc:
+            self.error = f"{type(exc).__name__}: {exc}"
+            self._pending = None
+            return False
+        self.current = dataset
+        self._seen = signatures
+        self._pending = None
+        self.error = None
+        self.refreshes += 1
+        self.refresh_seconds = time.perf_counter() - started
+        self.refreshed_at = time.time()
+        return True
+
+    def status(self):
+        return {
+            "version": self.current.version,
+            "rows": len(self.current.data),
+            "refreshed_at": self.refreshed_at,
+            "refresh_seconds": self.refresh_seconds,
+            "refreshes": self.refreshes,
+            "error": self.error,
+        }
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+# Stopped when the cache entry goes (e.g. "Clear cache"), so no orphaned
+# thread keeps polling and keeps the old dataset alive
+@st.cache_resource(show_spinner="Loading sea level data...", on_release=DatasetRefresher.stop)
+def _refresher(source, partition):
+    return DatasetRefresher(source, partition)
+
+
+def get_refresher(source=None, country=None, indicator=None):
+    """The process-wide DatasetRefresher behind get_dataset()."""
+    partition = (country or "WLD", indicator or "ECCL") if country or indicator else None
+    return _refresher(source or default_source(), partition)
+
+
+def get_dataset(source=None, country=None, indicator=None):
+    """The current process-wide dataset for `source`, built on first use and
+    kept fresh in the background (see DatasetRefresher). With a `country`
+    (ISO3) and/or climate `indicator` (CTS code) it comes from that
+    partition of the dataset store instead, reading only DATASET_COLUMNS.
+    Call it once per rerun and use that object throughout."""
+    return get_refresher(source, country, indicator).current
+
+
+def available_partitions():
+    """(country, indicator) pairs in the dataset store, with their labels.
+    Keeping the store current is the refreshers' job; this only fills an
+    empty store so the first rerun has something to pick from."""
+    partitions = dataset_store.partitions()
+    if partitions.empty:
+        dataset_store.ensure_store()
+        partitions = dataset_store.partitions()
+    return partitions
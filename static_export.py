@@ -0,0 +1,311 @@
+"""Static copies of the dashboard for when live reruns cannot keep up.
+
+    python static_export.py [--out site] [--processes N] [--data-files] [--force]
+
+Renders every view final_app.py can show with its default settings, using
+the same chart functions (charts.py) and dataset:
+
+    index.html                     links to everything below
+    regions/<region>.html          heatmap and line chart for one sidebar region
+    regions/<region>-heatmap.vl.json, regions/<region>-overall.vl.json
+    volatility.html                volatility/fastest-rising/yearly average combo
+    volatility.vl.json
+    takeaways.html                 the "Final Takeaways" section
+    manifest.json                  input hash and files of every view
+
+Each page embeds its Vega-Lite specs and data, so it opens from disk; the
+Vega JavaScript libraries come from the jsDelivr CDN, as in Altair's own
+HTML output. With --data-files the chart data goes to data/<hash>.json
+instead and the specs reference it by URL (serve the directory then).
+
+Views render in a process pool, and only those whose input hash changed
+since the last export are rendered again: a region's hash covers its rows,
+the whole-dataset views use the data version, and every hash includes the
+code behind the charts and their data (warm_start.CODE_FILES), so a
+change to charts.py or the dataset modules re-renders everything.
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import altair as alt
+import pandas as pd
+
+import warm_start
+from charts import TAKEAWAYS, heatmap_chart, overall_chart, volatility_charts
+from sea_level_data import HERE, _dump_json, _read_meta, _write_atomic, default_source
+from shared_dataset import load_dataset
+
+OUT_DIR = os.path.join(HERE, "site")
+# Bump when the page layout changes so every view is rendered again
+EXPORT_VERSION = 1
+TITLE = "Rising Waters: A Closer Look at Sea Level Changes"
+# Code whose changes invalidate every exported view: the dataset and chart
+# modules the warm-start bundles depend on, and this exporter
+CODE_FILES = warm_start.CODE_FILES + [os.path.abspath(__file__)]
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="https://cdn.jsdelivr.net/npm/vega@{vega}"></script>
+<script src="https://cdn.jsdelivr.net/npm/vega-lite@{vegalite}"></script>
+<script src="https://cdn.jsdelivr.net/npm/vega-embed@{vegaembed}"></script>
+<style>body {{ font-family: sans-serif; margin: 2em auto; max-width: 1200px; }} .chart {{ margin: 1.5em 0; }}</style>
+</head>
+<body>
+<p><a href="{root}index.html">All views</a></p>
+<h1>{heading}</h1>
+{body}
+</body>
+</html>
+"""
+
+# Set in each worker process by _init_worker()
+_dataset = None
+
+
+def slug(name):
+    """File name for a region: lower case, runs of other characters as "-"."""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "region"
+
+
+def _hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _code_hash(data_files):
+    sources = []
+    for path in CODE_FILES:
+        with open(path, "rb") as f:
+            sources.append(f.read())
+    return _hash(EXPORT_VERSION, data_files, alt.SCHEMA_VERSION, *sources)
+
+
+def _frame_hash(frame):
+    return _hash(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+
+
+def views(dataset):
+    """{view name: input data hash} for every page the export writes."""
+    found = {f"region:{region}": _frame_hash(dataset.view(region)) for region in dataset.regions}
+    found["volatility"] = dataset.version or _frame_hash(dataset.data2)
+    found["takeaways"] = _hash(TAKEAWAYS)
+    return found
+
+
+def _markdown(text):
+    """HTML for the bullet lists, **bold** and paragraphs TAKEAWAYS uses."""
+    out = []
+    for block in text.strip().split("\n\n"):
+        lines = block.strip().splitlines()
+        if all(line.startswith("- ") for line in lines):
+            items = "".join(f"<li>{_inline(line[2:])}</li>" for line in lines)
+            out.append(f"<ul>{items}</ul>")
+        else:
+            out.append(f"<p>{_inline(' '.join(lines))}</p>")
+    return "\n".join(out)
+
+
+def _inline(text):
+    return re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", html.escape(text, quote=False))
+
+
+def _spec(chart):
+    """Vega-Lite dict with the data inline, without Altair's row limit."""
+    with alt.data_transformers.enable("default", max_rows=None):
+        return chart.to_dict()
+
+
+def _move_data(spec, out_dir, prefix):
+    """Write the spec's inline datasets to data/<hash>.json and point the
+    spec at them by URL, relative to pages `prefix` deep."""
+    os.makedirs(os.path.join(out_dir, "data"), exist_ok=True)
+    urls = {}
+    written = []
+    for name, values in spec.pop("datasets", {}).items():
+        path = os.path.join("data", f"{name}.json")
+        if not os.path.exists(os.path.join(out_dir, path)):
+            _write_text(os.path.join(out_dir, path), json.dumps(values))
+        urls[name] = prefix + path.replace(os.sep, "/")
+        written.append(path)
+
+    def point(node):
+        if isinstance(node, dict):
+            data = node.get("data")
+            if isinstance(data, dict) and data.get("name") in urls:
+                node["data"] = {"url": urls[data["name"]]}
+            for value in node.values():
+                point(value)
+        elif isinstance(node, list):
+            for value in node:
+                point(value)
+
+    point(spec)
+    return written
+
+
+def _write_text(path, text):
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    _write_atomic(path, write)
+
+
+def _embed(specs):
+    """Chart <div>s plus the script that fills them."""
+    divs = "\n".join(f'<div class="chart" id="chart{i}"></div>' for i in range(len(specs)))
+    # "</" would end the <script> element early
+    specs = [json.dumps(spec).replace("</", "<\\/") for spec in specs]
+    calls = "\n".join(f'vegaEmbed("#chart{i}", {spec});' for i, spec in enumerate(specs))
+    return f"{divs}\n<script>\n{calls}\n</script>"
+
+
+def _page(heading, body, root=""):
+    return PAGE.format(
+        title=html.escape(f"{heading} · {TITLE}" if heading != TITLE else TITLE),
+        heading=html.escape(heading),
+        body=body,
+        root=root,
+        vega=alt.VEGA_VERSION,
+        vegalite=alt.VEGALITE_VERSION,
+        vegaembed=alt.VEGAEMBED_VERSION,
+    )
+
+
+def _write_charts(out_dir, page, heading, charts, root="", data_files=False):
+    """Write `page`.html and one `page`[-name].vl.json per (name, chart);
+    returns the paths written, relative to `out_dir`."""
+    written = []
+    specs = []
+    for name, chart in charts:
+        spec = _spec(chart)
+        if data_files:
+            written += _move_data(spec, out_dir, root)
+        path = f"{page}-{name}.vl.json" if name else f"{page}.vl.json"
+        _write_text(os.path.join(out_dir, path), json.dumps(spec))
+        written.append(path)
+        specs.append(spec)
+    _write_text(os.path.join(out_dir, page + ".html"), _page(heading, _embed(specs), root))
+    return [page + ".html"] + written
+
+
+def render_view(view, out_dir, data_files=False, dataset=None):
+    """Render one view (a key of views()); returns the files it wrote."""
+    dataset = dataset or _dataset
+    if view.startswith("region:"):
+        region = view[len("region:"):]
+        os.makedirs(os.path.join(out_dir, "regions"), exist_ok=True)
+        charts = [
+            ("heatmap", heatmap_chart(dataset.heatmap_cells(region))),
+            ("overall", overall_chart(dataset.line_rows(region))),
+        ]
+        page = os.path.join("regions", slug(region))
+        return _write_charts(out_dir, page, region, charts, root="../", data_files=data_files)
+    if view == "volatility":
+        chart = volatility_charts(dataset, dataset.first_year, dataset.last_year)
+        heading = "Regional Volatility in Sea Level Change"
+        return _write_charts(out_dir, "volatility", heading, [("", chart)], data_files=data_files)
+    if view == "takeaways":
+        _write_text(os.path.join(out_dir, "takeaways.html"), _page("Final Takeaways", _markdown(TAKEAWAYS)))
+        return ["takeaways.html"]
+    raise KeyError(f"Unknown view {view!r}")
+
+
+def _init_worker(source, partition):
+    global _dataset
+    _dataset = load_dataset(source, partition)
+
+
+def _index(dataset, manifest):
+    regions = [view[len("region:"):] for view in manifest["views"] if view.startswith("region:")]
+    links = "".join(
+        f'<li><a href="regions/{slug(region)}.html">{html.escape(region)}</a></li>'
+        for region in sorted(regions, key=lambda region: (region != "All", region))
+    )
+    body = (
+        f"<p>Data version {html.escape(dataset.version)}.</p>"
+        f"<h2>Regions</h2><ul>{links}</ul>"
+        '<h2>All regions</h2><ul><li><a href="volatility.html">Regional volatility and fastest-rising regions</a></li>'
+        '<li><a href="takeaways.html">Final takeaways</a></li></ul>'
+    )
+    return _page(TITLE, body)
+
+
+def export(out_dir=OUT_DIR, source=None, partition=None, processes=None, data_files=False, force=False):
+    """Render every view whose input hash changed into `out_dir`; returns
+    (views rendered, views skipped)."""
+    source = source or default_source()
+    dataset = load_dataset(source, partition)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    old = _read_meta(manifest_path) or {"views": {}}
+    code = _code_hash(data_files)
+    wanted = {view: _hash(code, data) for view, data in views(dataset).items()}
+
+    stale = [
+        view for view, digest in wanted.items()
+        if force
+        or old["views"].get(view, {}).get("hash") != digest
+        or not all(os.path.exists(os.path.join(out_dir, path)) for path in old["views"][view]["files"])
+    ]
+    manifest = {"version": dataset.version, "views": {}}
+    for view, entry in old["views"].items():
+        if view in wanted and view not in stale:
+            manifest["views"][view] = entry
+
+    if processes == 1 or len(stale) <= 1:
+        rendered = [render_view(view, out_dir, data_files, dataset) for view in stale]
+    else:
+        # Each worker loads the dataset once (from the snapshot) and renders many views
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_worker, initargs=(source, partition)
+        ) as pool:
+            rendered = list(pool.map(render_view, stale, [out_dir] * len(stale), [data_files] * len(stale)))
+    for view, files in zip(stale, rendered):
+        manifest["views"][view] = {"hash": wanted[view], "files": files}
+
+    # Pages of views that no longer exist (e.g. a region gone from the data)
+    keep = {path for entry in manifest["views"].values() for path in entry["files"]}
+    for view, entry in old["views"].items():
+        for path in entry["files"]:
+            if path not in keep and not path.startswith("data") and os.path.exists(os.path.join(out_dir, path)):
+                os.remove(os.path.join(out_dir, path))
+
+    _write_text(os.path.join(out_dir, "index.html"), _index(dataset, manifest))
+    _write_atomic(manifest_path, lambda tmp: _dump_json(manifest, tmp))
+    return stale, [view for view in wanted if view not in stale]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the dashboard's views to static HTML and Vega-Lite JSON.")
+    parser.add_argument("--out", default=OUT_DIR, help="output directory (default: site/)")
+    parser.add_argument("--source", help="export file (default: the bundled workbook)")
+    parser.add_argument("--country", help="ISO3 code of a dataset store partition")
+    parser.add_argument("--indicator", help="CTS code of a dataset store partition")
+    parser.add_argument("--processes", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--data-files", action="store_true", help="write chart data to data/*.json")
+    parser.add_argument("--force", action="store_true", help="render every view, changed or not")
+    args = parser.parse_args(argv)
+
+    partition = (args.country or "WLD", args.indicator or "ECCL") if args.country or args.indicator else None
+    started = time.perf_counter()
+    rendered, skipped = export(args.out, args.source, partition, args.processes, args.data_files, args.force)
+    print(f"{len(rendered)} views rendered, {len(skipped)} unchanged, "
+          f"in {time.perf_counter() - started:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
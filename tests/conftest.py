@@ -0,0 +1,35 @@
+import pytest
+
+import mission_merge
+import sea_level_data
+from shared_dataset import MAX_YEAR, SeaLevelDataset
+
+
+@pytest.fixture(scope="session")
+def snapshot_dir(tmp_path_factory):
+    """Snapshots and cached merged series go to a temporary directory
+    instead of the checkout's .snapshot/."""
+    path = str(tmp_path_factory.mktemp("snapshot"))
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(sea_level_data, "SNAPSHOT_DIR", path)
+        mp.setattr(mission_merge, "SNAPSHOT_DIR", path)
+        yield path
+
+
+@pytest.fixture(scope="session")
+def workbook():
+    """Every row of the bundled workbook, parsed without a snapshot."""
+    data = sea_level_data.read_source(sea_level_data.default_source())
+    data["Year"] = data["Year"].astype("int64")
+    return data
+
+
+@pytest.fixture(scope="session")
+def raw(workbook):
+    """The workbook's rows as the apps used to read them, up to MAX_YEAR."""
+    return workbook[workbook["Year"] <= MAX_YEAR]
+
+
+@pytest.fixture(scope="session")
+def dataset(snapshot_dir):
+    return SeaLevelDataset(sea_level_data.load_sea_levels(sea_level_data.default_source()))
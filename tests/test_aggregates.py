@@ -0,0 +1,78 @@
+"""The dashboard's tables against the raw-row groupbys they replaced.
+
+They are roll-ups of count/sum/sum-of-squares cells rather than a pass over
+the rows, so values agree within float64 rounding rather than bit for bit.
+"""
+import pandas as pd
+import pytest
+
+# Summing the cells in another order than the rows moves the last few bits
+RTOL = 1e-12
+ATOL = 1e-12
+
+
+def _plain(frame):
+    """Labels as Python strings and years as int64, so only values and
+    order are compared, not how compactly each side stores them."""
+    frame = frame.copy()
+    for col in frame.columns:
+        if col == "Year":
+            frame[col] = frame[col].astype("int64")
+        elif not pd.api.types.is_numeric_dtype(frame[col]):
+            frame[col] = frame[col].astype(str).astype(object)
+    return frame
+
+
+def assert_same_table(table, expected, check_index=True):
+    if not check_index:
+        table, expected = table.reset_index(drop=True), expected.reset_index(drop=True)
+    pd.testing.assert_frame_equal(
+        _plain(table), _plain(expected), check_exact=False, rtol=RTOL, atol=ATOL, check_index_type=False
+    )
+
+
+def _volatility(rows):
+    return rows.groupby("Measure", as_index=False)["Value"].std().rename(columns={"Value": "Volatility"})
+
+
+def test_average_per_year(dataset, raw):
+    assert_same_table(dataset.average_per_year, raw.groupby("Year", as_index=False)["Value"].mean())
+
+
+def test_average_per_measure(dataset, raw):
+    assert_same_table(dataset.average_per_measure, raw.groupby(["Year", "Measure"], as_index=False)["Value"].mean())
+
+
+def test_volatility_by_region(dataset, raw):
+    assert_same_table(dataset.volatility_by_region, _volatility(raw))
+
+
+def test_top_volatile(dataset, raw):
+    expected = _volatility(raw).sort_values("Volatility", ascending=False).head(10)
+    assert_same_table(dataset.top_volatile, expected)
+    assert dataset.top_10_measures == expected["Measure"].tolist()
+
+    average_per_measure = raw.groupby(["Year", "Measure"], as_index=False)["Value"].mean()
+    top10 = average_per_measure[average_per_measure["Measure"].isin(expected["Measure"])]
+    assert_same_table(dataset.average_per_measure_top10, top10)
+
+
+@pytest.mark.parametrize("region", ["All", "Baltic Sea", "Indian Ocean", "World"])
+def test_year_average_and_heatmap(dataset, raw, region):
+    rows = raw if region == "All" else raw[raw["Measure"] == region]
+    year_average = dataset.year_average(region)[["Year", "Value"]]
+    assert_same_table(year_average, rows.groupby("Year", as_index=False)["Value"].mean())
+    cells = rows.groupby(["Year", "Measure"], as_index=False)["Value"].mean()
+    assert_same_table(dataset.heatmap_cells(region), cells, check_index=False)
+
+
+@pytest.mark.parametrize("start, end", [(None, None), (1993, 2000), (2010, 2024), (2005, 2005)])
+def test_year_window(dataset, raw, start, end):
+    start, end = start or dataset.first_year, end or dataset.last_year
+    rows = raw[raw["Year"].between(start, end)]
+    means = dataset.year_index.year_means(start, end)
+    assert_same_table(means, rows.groupby("Year", as_index=False)["Value"].mean())
+
+    expected = _volatility(rows).sort_values("Volatility", ascending=False).head(10)
+    top = dataset.year_index.top_volatile(start, end, 10)
+    assert_same_table(top, expected, check_index=False)
@@ -0,0 +1,73 @@
+"""Appending a release (append_rows + SeaLevelDataset.appended) against
+building the dataset from the whole export."""
+import pytest
+
+from sea_level_data import append_rows, load_sea_levels
+from shared_dataset import SeaLevelDataset
+
+from .test_aggregates import assert_same_table
+
+# Rows at the end of the workbook that arrive as a release
+RELEASE_ROWS = 1251
+
+
+@pytest.fixture(scope="module")
+def exports(workbook, snapshot_dir, tmp_path_factory):
+    """(base export, release, full export) as CSV files."""
+    directory = tmp_path_factory.mktemp("exports")
+    rows = workbook.drop(columns="Mission")
+    paths = [str(directory / name) for name in ("base.csv", "release.csv", "full.csv")]
+    for frame, path in zip([rows.iloc[:-RELEASE_ROWS], rows.iloc[-RELEASE_ROWS:], rows], paths):
+        frame.to_csv(path, index=False)
+    return paths
+
+
+@pytest.fixture(scope="module")
+def appended(exports):
+    base, release, _ = exports
+    before = SeaLevelDataset(load_sea_levels(base))
+    data, added = append_rows(base, release)
+    assert len(added) == RELEASE_ROWS
+    return before, before.appended(data, added)
+
+
+@pytest.fixture(scope="module")
+def full(exports):
+    return SeaLevelDataset(load_sea_levels(exports[2]))
+
+
+@pytest.mark.parametrize("table", [
+    "average_per_year", "average_per_measure", "average_per_measure_top10",
+    "volatility_by_region", "volatility_all_years", "top_volatile",
+])
+def test_tables_match_full_build(appended, full, table):
+    assert_same_table(getattr(appended[1], table), getattr(full, table), check_index=False)
+
+
+def test_rows_and_indexes_match_full_build(appended, full):
+    _, dataset = appended
+    assert dataset.top_10_measures == full.top_10_measures
+    key = ["Measure", "Mission", "Date"]
+    assert_same_table(
+        dataset.view()[key + ["Value"]].sort_values(key, kind="stable"),
+        full.view()[key + ["Value"]].sort_values(key, kind="stable"),
+        check_index=False,
+    )
+    for start, end in [(full.first_year, full.last_year), (2015, 2024)]:
+        assert_same_table(dataset.year_index.year_means(start, end), full.year_index.year_means(start, end))
+        assert_same_table(dataset.year_index.top_volatile(start, end), full.year_index.top_volatile(start, end))
+    assert_same_table(dataset.heatmap_cells("Baltic Sea"), full.heatmap_cells("Baltic Sea"), check_index=False)
+
+
+def test_append_changes_version(appended):
+    before, after = appended
+    assert after.version != before.version
+
+
+def test_appending_again_adds_nothing(exports, appended):
+    base, release, _ = exports
+    _, dataset = appended
+    data, added = append_rows(base, release)
+    assert len(added) == 0
+    assert len(data) == len(dataset.data)
+    assert data.attrs["source_sha256"][:12] == dataset.version
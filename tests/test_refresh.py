@@ -0,0 +1,48 @@
+"""DatasetRefresher picking up a release, including when another refresher
+on the same source appended it first."""
+import pytest
+
+from shared_dataset import DatasetRefresher, _refresher
+
+RELEASE_ROWS = 1251
+
+
+@pytest.fixture
+def source(workbook, snapshot_dir, tmp_path):
+    """(export, release directory, release rows) with the release not dropped yet."""
+    rows = workbook.drop(columns="Mission")
+    # Snapshots are named after the export, so keep it apart from other tests'
+    path = str(tmp_path / f"refresh-{tmp_path.name}.csv")
+    rows.iloc[:-RELEASE_ROWS].to_csv(path, index=False)
+    releases = tmp_path / "releases"
+    releases.mkdir()
+    return path, releases, rows.iloc[-RELEASE_ROWS:]
+
+
+def test_second_refresher_sees_release(source, workbook):
+    path, releases, release = source
+    refreshers = [DatasetRefresher(path, release_dir=str(releases), interval=3600) for _ in range(2)]
+    try:
+        assert len(refreshers[0].current.data) == len(workbook) - RELEASE_ROWS
+        release.to_csv(releases / "release.csv", index=False)
+        for refresher in refreshers:
+            assert refresher.refresh(), refresher.error
+        first, second = (refresher.current for refresher in refreshers)
+        assert len(first.data) == len(second.data) == len(workbook)
+        assert first.version == second.version
+        # Nothing new: both keep what they have
+        for refresher in refreshers:
+            current = refresher.current
+            refresher.refresh()
+            assert refresher.current is current
+    finally:
+        for refresher in refreshers:
+            refresher.stop()
+
+
+def test_clearing_cache_stops_refresher(source):
+    path, releases, _ = source
+    refresher = _refresher(path, None)
+    assert refresher._thread.is_alive()
+    _refresher.clear()
+    assert not refresher._thread.is_alive()
@@ -0,0 +1,47 @@
+"""stage_source() with chunks whose column types disagree."""
+import numpy as np
+import pandas as pd
+
+from sea_level_data import read_source, stage_source
+
+CHUNK_ROWS = 100
+
+
+def _stage(workbook, tmp_path, edit):
+    rows = workbook.drop(columns="Mission").head(5 * CHUNK_ROWS).copy()
+    edit(rows)
+    source = str(tmp_path / "export.csv")
+    rows.to_csv(source, index=False)
+    staged = str(tmp_path / "staged.parquet")
+    assert stage_source(source, staged, chunk_rows=CHUNK_ROWS) == len(rows)
+    return pd.read_parquet(staged), read_source(source)
+
+
+def test_column_blank_in_first_chunk(workbook, tmp_path):
+    def edit(rows):
+        rows["ISO2"] = np.where(np.arange(len(rows)) < 2 * CHUNK_ROWS, None, "XX")
+
+    staged, parsed = _stage(workbook, tmp_path, edit)
+    assert staged["ISO2"].isna().sum() == 2 * CHUNK_ROWS
+    assert (staged["ISO2"].iloc[2 * CHUNK_ROWS:].astype(str) == "XX").all()
+    assert staged["Value"].tolist() == parsed["Value"].tolist()
+
+
+def test_int_column_turns_float(workbook, tmp_path):
+    def edit(rows):
+        # Whole numbers (written without a decimal point) until gaps and
+        # fractions appear in a later chunk
+        ids = [i if i < 3 * CHUNK_ROWS else (None if i % 2 else i + 0.5) for i in range(len(rows))]
+        rows["Object ID"] = pd.Series(ids, index=rows.index, dtype=object)
+
+    staged, parsed = _stage(workbook, tmp_path, edit)
+    assert staged["Object ID"].dtype == "float64"
+    np.testing.assert_array_equal(staged["Object ID"].to_numpy(), parsed["Object ID"].to_numpy())
+
+
+def test_text_and_numbers_become_text(workbook, tmp_path):
+    def edit(rows):
+        rows["ISO2"] = np.where(np.arange(len(rows)) < CHUNK_ROWS, "12", "US")
+
+    staged, _ = _stage(workbook, tmp_path, edit)
+    assert staged["ISO2"].astype(str).tolist() == ["12"] * CHUNK_ROWS + ["US"] * 4 * CHUNK_ROWS
@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+# Set to 1 to time every rerun (and background loads) in the process, not
+# just the sessions that turned the debug panel on
+ENABLED = os.environ.get("SEA_LEVEL_TIMINGS") == "1"
+# Where finished reruns go when timing is on: one JSON object per rerun
+# appended to the first, Prometheus text-format totals rewritten to the second
+JSONL_PATH = os.environ.get("SEA_LEVEL_TIMINGS_JSONL")
+PROMETHEUS_PATH = os.environ.get("SEA_LEVEL_TIMINGS_PROM")
+
+# The rerun being timed on this thread, if any; Streamlit runs each
+# session's script on its own thread
+_local = threading.local()
+
+
+class _NullStage:
+    """What stage() hands out when nothing is being timed: entering, leaving
+    and setting `rows`/`bytes` on it do nothing worth measuring."""
+
+    active = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Stage:
+    """A timed block. Set `rows` (rows processed) and `bytes` (payload
+    produced) on it inside the block when they are known."""
+
+    active = True
+
+    def __init__(self, name, recorder):
+        self.name = name
+        self.recorder = recorder
+        self.rows = 0
+        self.bytes = 0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.started
+        REGISTRY.add(self.name, seconds, self.rows, self.bytes)
+        if self.recorder is not None:
+            self.recorder.add(self.name, seconds, self.rows, self.bytes)
+        return False
+
+
+def stage(name):
+    """`with stage("filter") as s: ...` times the block as `name` when this
+    rerun is being timed (or SEA_LEVEL_TIMINGS=1); otherwise it costs a
+    thread-local lookup."""
+    recorder = getattr(_local, "rerun", None)
+    if recorder is None and not ENABLED:
+        return _NULL_STAGE
+    return Stage(name, recorder)
+
+
+def count(name, n=1):
+    """Count an event (e.g. a cache hit) as a zero-length stage."""
+    if getattr(_local, "rerun", None) is not None or ENABLED:
+        with Stage(name, getattr(_local, "rerun", None)) as s:
+            s.rows = n
+
+
+class _Totals:
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.rows = defaultdict(int)
+        self.bytes = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, rows, nbytes):
+        with self._lock:
+            self.calls[name] += 1
+            self.seconds[name] += seconds
+            self.rows[name] += rows
+            self.bytes[name] += nbytes
+
+    def table(self):
+        """[{stage, calls, seconds, rows, bytes}], slowest stage first."""
+        with self._lock:
+            rows = [
+                {
+                    "stage": name,
+                    "calls": self.calls[name],
+                    "seconds": self.seconds[name],
+                    "rows": self.rows[name],
+                    "bytes": self.bytes[name],
+                }
+                for name in self.calls
+            ]
+        return sorted(rows, key=lambda row: row["seconds"], reverse=True)
+
+
+class Rerun(_Totals):
+    """Per-stage totals for one script run."""
+
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.total_seconds = None
+
+    def record(self):
+        return {
+            "app": self.app,
+            "started_at": self.started_at,
+            "total_seconds": self.total_seconds,
+            "stages": self.table(),
+        }
+
+
+# Process-wide totals since start-up, for the Prometheus export
+REGISTRY = _Totals()
+
+
+def begin_rerun(app, enabled=False):
+    """Start timing this rerun of `app` if `enabled` (e.g. the session's
+    debug toggle) or SEA_LEVEL_TIMINGS=1. Returns the Rerun, or None."""
+    _local.rerun = Rerun(app) if enabled or ENABLED else None
+    return _local.rerun
+
+
+def end_rerun():
+    """Finish the current rerun and export it. Returns it, or None."""
+    rerun = getattr(_local, "rerun", None)
+    _local.rerun = None
+    if rerun is None:
+        return None
+    rerun.total_seconds = time.perf_counter() - rerun.started
+    REGISTRY.add("rerun", rerun.total_seconds, 0, 0)
+    if JSONL_PATH:
+        write_jsonl(rerun, JSONL_PATH)
+    if PROMETHEUS_PATH:
+        write_prometheus(PROMETHEUS_PATH)
+    return rerun
+
+
+_export_lock = threading.Lock()
+
+
+def write_jsonl(rerun, path):
+    line = json.dumps(rerun.record())
+    with _export_lock, open(path, "a") as f:
+        f.write(line + "\n")
+
+
+PROMETHEUS_METRICS = [
+    ("calls", "sea_level_stage_calls_total", "Times each dashboard stage ran"),
+    ("seconds", "sea_level_stage_seconds_total", "Seconds spent in each dashboard stage"),
+    ("rows", "sea_level_stage_rows_total", "Rows processed by each dashboard stage"),
+    ("bytes", "sea_level_stage_bytes_total", "Chart payload bytes produced by each dashboard stage"),
+]
+
+
+def prometheus_text(totals=REGISTRY):
+    lines = []
+    table = totals.table()
+    for field, metric, description in PROMETHEUS_METRICS:
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} counter"]
+        lines += [f'{metric}{{stage="{row["stage"]}"}} {row[field]}' for row in table]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path, totals=REGISTRY):
+    """Rewrite `path` with the totals, e.g. for node_exporter's textfile collector."""
+    text = prometheus_text(totals)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with _export_lock:
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
@@ -0,0 +1,251 @@
+"""Warm-start bundles: a built SeaLevelDataset saved so a new process (a
+fresh container, another replica) loads it instead of rebuilding it.
+
+    python warm_start.py [--source export.xlsx] [--country WLD --indicator ECCL]
+
+Run it at build time, after the data is in place. Without --country or
+--indicator it bundles the source file and every partition of the dataset
+store. A bundle is a directory holding:
+
+    arrays/<n>.npy  every large column and array (the rows, the prefix-sum
+                    indexes...), memory-mapped when loaded, so nothing is
+                    parsed and pages are read only when touched
+    state.pickle    everything else: aggregate tables, offsets, regions, and
+                    the serialized specs of the first page's charts
+                    (charts.first_paint_specs), so the first rerun builds no
+                    chart and does not import altair
+    bundle.json     what it was built from
+
+load_dataset() uses a bundle only when it was built from the same data (the
+snapshot's or store partition's hash) by the same code; otherwise it is
+ignored and the dataset is built as usual. The bundle is a trusted local
+build artifact: state.pickle is unpickled as is.
+"""
+import argparse
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import dataset_store
+import timing
+from sea_level_data import HERE, SNAPSHOT_DIR, _UMASK, _dump_json, _read_meta, default_source, ensure_snapshot
+
+BUNDLE_DIR = os.environ.get("SEA_LEVEL_BUNDLE", os.path.join(SNAPSHOT_DIR, "bundle"))
+# Bump when the bundle layout changes
+BUNDLE_VERSION = 1
+# Modules whose changes make existing bundles stale: they define the
+# objects in state.pickle and the charts in it
+CODE_FILES = [
+    os.path.join(HERE, name)
+    for name in ["shared_dataset.py", "sea_level_stats.py", "sea_level_data.py", "mission_merge.py", "downsample.py", "charts.py"]
+]
+# Frames and arrays of at least this many bytes go to arrays/ and are
+# memory-mapped on load; smaller ones are pickled inline
+MAP_MIN_BYTES = 64 << 10
+
+
+def bundle_path(source, partition=None, bundle_dir=BUNDLE_DIR):
+    name = "-".join(partition) if partition else "file-" + os.path.basename(source)
+    return os.path.join(bundle_dir, name)
+
+
+def code_sha256():
+    digest = hashlib.sha256()
+    for path in CODE_FILES:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def data_sha256(source, partition=None):
+    """The `source_sha256` the dataset for (source, partition) would have,
+    from metadata alone (bringing the snapshot or store up to date first)."""
+    if partition is None:
+        meta = ensure_snapshot(source)
+        # Appended releases (sea_level_data.append_rows) change the data but not the source
+        return meta.get("data_sha256", meta["sha256"])
+    dataset_store.ensure_store([source])
+    return dataset_store.partition_sha256(*partition)
+
+
+def _mappable(frame):
+    """Frames whose columns can all live in .npy files: numbers, dates and
+    categoricals (codes in the file, categories pickled)."""
+    return all(
+        isinstance(dtype, pd.CategoricalDtype) or (isinstance(dtype, np.dtype) and dtype.kind in "biufmM")
+        for dtype in frame.dtypes
+    ) and frame.columns.is_unique
+
+
+class _BundlePickler(pickle.Pickler):
+    """Pickles large arrays and frames as references to .npy files."""
+
+    def __init__(self, f, arrays_dir):
+        super().__init__(f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.arrays_dir = arrays_dir
+        self.saved = {}
+        # Keep every saved object alive so its id() is not reused
+        self._objects = []
+
+    def _save_array(self, values):
+        name = f"{len(os.listdir(self.arrays_dir))}.npy"
+        np.save(os.path.join(self.arrays_dir, name), np.ascontiguousarray(values), allow_pickle=False)
+        return name
+
+    def persistent_id(self, obj):
+        if id(obj) in self.saved:
+            return self.saved[id(obj)]
+        if isinstance(obj, np.ndarray) and obj.dtype.kind in "biufmM" and obj.nbytes >= MAP_MIN_BYTES:
+            pid = ("array", self._save_array(obj))
+        elif isinstance(obj, pd.DataFrame) and _mappable(obj) and obj.memory_usage(index=False).sum() >= MAP_MIN_BYTES:
+            columns = []
+            for col in obj.columns:
+                values = obj[col]
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    categories = values.cat.categories
+                    columns.append((col, self._save_array(values.cat.codes.to_numpy()), categories, values.cat.ordered))
+                else:
+                    columns.append((col, self._save_array(values.to_numpy()), None, None))
+            index = obj.index
+            if isinstance(index, pd.RangeIndex):
+                index = ("range", index.start, index.stop, index.step)
+            else:
+                index = ("values", self._save_array(index.to_numpy()))
+            pid = ("frame", columns, index, dict(obj.attrs))
+        else:
+            return None
+        self.saved[id(obj)] = pid
+        self._objects.append(obj)
+        return pid
+
+
+class _BundleUnpickler(pickle.Unpickler):
+    def __init__(self, f, arrays_dir):
+        super().__init__(f)
+        self.arrays_dir = arrays_dir
+
+    def _load_array(self, name):
+        # A plain ndarray view of the mapping, so np.memmap does not leak into results
+        return np.asarray(np.load(os.path.join(self.arrays_dir, name), mmap_mode="r", allow_pickle=False))
+
+    def persistent_load(self, pid):
+        if pid[0] == "array":
+            return self._load_array(pid[1])
+        _, columns, index, attrs = pid
+        data = {}
+        for col, name, categories, ordered in columns:
+            values = self._load_array(name)
+            if categories is not None:
+                values = pd.Categorical.from_codes(values, categories=categories, ordered=ordered, validate=False)
+            data[col] = values
+        if index[0] == "range":
+            index = pd.RangeIndex(*index[1:])
+        else:
+            index = pd.Index(self._load_array(index[1]))
+        frame = pd.DataFrame(data, index=index, copy=False)
+        frame.attrs = attrs
+        return frame
+
+
+def _temp_dir(parent, name, suffix):
+    """A new empty directory in `parent`, unique across threads and processes,
+    with the usual umask-based mode rather than mkdtemp's 0700."""
+    path = tempfile.mkdtemp(suffix=suffix, prefix=name + ".", dir=parent)
+    os.chmod(path, 0o777 & ~_UMASK)
+    return path
+
+
+def save_bundle(dataset, path, source_sha256):
+    """Write `dataset` to a bundle directory at `path`, replacing any old
+    one only once the new one is complete."""
+    parent, name = os.path.split(path)
+    os.makedirs(parent, exist_ok=True)
+    tmp = _temp_dir(parent, name, ".tmp")
+    try:
+        arrays_dir = os.path.join(tmp, "arrays")
+        os.makedirs(arrays_dir)
+        with open(os.path.join(tmp, "state.pickle"), "wb") as f:
+            _BundlePickler(f, arrays_dir).dump(dataset)
+        meta = {
+            "version": BUNDLE_VERSION,
+            "code_sha256": code_sha256(),
+            "source_sha256": source_sha256,
+            "dataset_version": dataset.version,
+            "rows": len(dataset.data),
+            "created": time.time(),
+        }
+        _dump_json(meta, os.path.join(tmp, "bundle.json"))
+        # Processes still mapping the old arrays keep them until they exit (POSIX)
+        old = _temp_dir(parent, name, ".old")
+        try:
+            os.replace(path, old)
+        except FileNotFoundError:
+            pass
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            # Another writer put its bundle there in between; keep that one
+            pass
+        shutil.rmtree(old, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return meta
+
+
+def build_bundle(source=None, partition=None, bundle_dir=BUNDLE_DIR):
+    """Build the dataset for (source, partition) and the first page's
+    charts from scratch and save them as a bundle; returns its metadata."""
+    from charts import first_paint_specs
+    from shared_dataset import load_dataset
+
+    source = source or default_source()
+    dataset = load_dataset(source, partition, bundle=False)
+    dataset.chart_specs = first_paint_specs(dataset)
+    return save_bundle(dataset, bundle_path(source, partition, bundle_dir), data_sha256(source, partition))
+
+
+def load_bundle(source, partition=None, bundle_dir=BUNDLE_DIR):
+    """The bundled dataset for (source, partition), or None if there is no
+    bundle or it was built from other data or code."""
+    path = bundle_path(source, partition, bundle_dir)
+    meta = _read_meta(os.path.join(path, "bundle.json"))
+    if meta is None or meta.get("version") != BUNDLE_VERSION or meta.get("code_sha256") != code_sha256():
+        return None
+    if meta.get("source_sha256") != data_sha256(source, partition):
+        return None
+    with timing.stage("load_bundle") as s, open(os.path.join(path, "state.pickle"), "rb") as f:
+        dataset = _BundleUnpickler(f, os.path.join(path, "arrays")).load()
+        s.rows = len(dataset.data)
+    return dataset
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build warm-start bundles of the sea level datasets.")
+    parser.add_argument("--source", help="export file (default: the bundled workbook)")
+    parser.add_argument("--country", help="ISO3 code of one dataset store partition")
+    parser.add_argument("--indicator", help="CTS code of one dataset store partition")
+    parser.add_argument("--out", default=BUNDLE_DIR, help="bundle directory (default: .snapshot/bundle)")
+    args = parser.parse_args(argv)
+
+    source = args.source or default_source()
+    if args.country or args.indicator:
+        targets = [(args.country or "WLD", args.indicator or "ECCL")]
+    else:
+        dataset_store.ensure_store([source])
+        targets = [None] + [tuple(row) for row in dataset_store.partitions()[["country", "indicator"]].to_numpy()]
+    for partition in targets:
+        started = time.perf_counter()
+        meta = build_bundle(source, partition, args.out)
+        label = "/".join(partition) if partition else os.path.basename(source)
+        print(f"{label}: {meta['rows']} rows, version {meta['dataset_version']} "
+              f"in {time.perf_counter() - started:.1f}s -> {bundle_path(source, partition, args.out)}")
+
+
+if __name__ == "__main__":
+    main()
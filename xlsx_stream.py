@@ -0,0 +1,171 @@
+import posixpath
+import re
+import zipfile
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+
+NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Built-in number formats that display dates (ECMA-376 18.8.30)
+BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+# A custom format is a date format if it uses date/time tokens outside of
+# quoted literals and [colour]/[condition] sections
+DATE_TOKENS = re.compile(r"[dmyhs]", re.IGNORECASE)
+FORMAT_LITERALS = re.compile(r'"[^"]*"|\[[^\]]*\]|\\.')
+
+CHUNK_ROWS = 50_000
+
+
+def _column_index(ref):
+    """Zero-based column of a cell reference such as "AB12"."""
+    index = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - 64
+    return index - 1
+
+
+def _shared_strings(archive):
+    """Every shared string, resolved once. Cells then reuse these exact str
+    objects, so a column of repeated labels costs a pointer per cell."""
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, elem in ElementTree.iterparse(f):
+            if elem.tag == NS + "si":
+                strings.append("".join(text.text or "" for text in elem.iter(NS + "t")))
+                elem.clear()
+    return strings
+
+
+def _date_styles(archive):
+    """Indices of the cell styles (`s` attribute) that format dates."""
+    if "xl/styles.xml" not in archive.namelist():
+        return set()
+    root = ElementTree.fromstring(archive.read("xl/styles.xml"))
+    custom = {}
+    for fmt in root.iter(NS + "numFmt"):
+        code = FORMAT_LITERALS.sub("", fmt.get("formatCode", ""))
+        custom[int(fmt.get("numFmtId"))] = bool(DATE_TOKENS.search(code))
+    cell_xfs = root.find(NS + "cellXfs")
+    if cell_xfs is None:
+        return set()
+    dates = set()
+    for index, xf in enumerate(cell_xfs.findall(NS + "xf")):
+        fmt_id = int(xf.get("numFmtId", 0))
+        if fmt_id in BUILTIN_DATE_FORMATS or custom.get(fmt_id, False):
+            dates.add(index)
+    return dates
+
+
+def _first_sheet(archive):
+    """(path of the first worksheet, whether the workbook uses the 1904 date system)."""
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    properties = workbook.find(NS + "workbookPr")
+    date1904 = properties is not None and properties.get("date1904") in ("1", "true")
+    sheet = workbook.find(f"{NS}sheets/{NS}sheet")
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(PKG_REL_NS + "Relationship"):
+        if rel.get("Id") == sheet.get(REL_NS + "id"):
+            target = rel.get("Target")
+            path = target.lstrip("/") if target.startswith("/") else posixpath.join("xl", target)
+            return posixpath.normpath(path), date1904
+    return "xl/worksheets/sheet1.xml", date1904
+
+
+def iter_rows(path):
+    """Yield each row of the first worksheet as a list of cell values
+    (str, float, or ("date", serial) for date-formatted numbers; None for
+    empty cells). The sheet XML is parsed incrementally and every finished
+    row is dropped from the tree, so memory does not grow with the sheet."""
+    with zipfile.ZipFile(path) as archive:
+        strings = _shared_strings(archive)
+        date_styles = _date_styles(archive)
+        sheet_path, _ = _first_sheet(archive)
+        with archive.open(sheet_path) as f:
+            sheet_data = None
+            for event, elem in ElementTree.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    if elem.tag == NS + "sheetData":
+                        sheet_data = elem
+                    continue
+                if elem.tag != NS + "row":
+                    continue
+                values = []
+                for cell in elem.iter(NS + "c"):
+                    column = _column_index(cell.get("r", "")) if cell.get("r") else len(values)
+                    values.extend([None] * (column - len(values)))
+                    values.append(_cell_value(cell, strings, date_styles))
+                yield values
+                elem.clear()
+                if sheet_data is not None:
+                    sheet_data.clear()
+
+
+def _cell_value(cell, strings, date_styles):
+    kind = cell.get("t", "n")
+    if kind == "inlineStr":
+        return "".join(text.text or "" for text in cell.iter(NS + "t"))
+    raw = cell.findtext(NS + "v")
+    if raw is None:
+        return None
+    if kind == "s":
+        return strings[int(raw)]
+    if kind in ("str", "e"):
+        return raw
+    if kind == "b":
+        return raw == "1"
+    number = float(raw)
+    if int(cell.get("s", 0)) in date_styles:
+        return ("date", number)
+    return number
+
+
+def iter_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Yield the first worksheet as DataFrames of at most `chunk_rows` rows,
+    with the first row as the header and date cells as datetimes."""
+    with zipfile.ZipFile(path) as archive:
+        _, date1904 = _first_sheet(archive)
+    origin = pd.Timestamp("1904-01-01") if date1904 else pd.Timestamp("1899-12-30")
+
+    rows = iter_rows(path)
+    header = next(rows, None)
+    if header is None:
+        return
+    header = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+    width = len(header)
+
+    chunk = []
+    for values in rows:
+        values = values[:width] + [None] * (width - len(values))
+        chunk.append(values)
+        if len(chunk) >= chunk_rows:
+            yield _to_frame(chunk, header, origin)
+            chunk = []
+    if chunk:
+        yield _to_frame(chunk, header, origin)
+
+
+def _to_frame(chunk, header, origin):
+    columns = {}
+    for i, name in enumerate(header):
+        values = [row[i] for row in chunk]
+        present = [v for v in values if v is not None]
+        if present and all(isinstance(v, tuple) for v in present):
+            serials = np.array([np.nan if v is None else v[1] for v in values])
+            columns[name] = origin + pd.to_timedelta(serials, unit="D")
+        elif present and all(isinstance(v, float) for v in present):
+            columns[name] = np.array([np.nan if v is None else v for v in values])
+        elif not present:
+            columns[name] = np.full(len(values), np.nan)
+        else:
+            columns[name] = pd.Series(
+                [v[1] if isinstance(v, tuple) else v for v in values], dtype=object
+            )
+    return pd.DataFrame(columns)